@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import argparse
+import collections
+import importlib.util
+import json
+import math
+import shlex
+import shutil
+import tempfile
+import time
+
+# Throughput benchmark of generateCPPProjectStructure.py, generates synthetic projects into a tmpfs and an ordinary
+# directory so the cost of the generator itself can be told apart from the cost of the file system.
+
+
+def loadGenerator():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generateCPPProjectStructure.py")
+    spec = importlib.util.spec_from_file_location("generateCPPProjectStructure", path)
+    generator = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(generator)
+    return generator
+
+
+def percentile(sortedValues, fraction):
+    if not sortedValues:
+        return 0.0
+    return sortedValues[max(0, math.ceil(fraction * len(sortedValues)) - 1)]
+
+
+def runBenchmark(generator, targetDir, projectCount, warmupCount, generatorArgv):
+    argParser = generator.createArgParser()
+    sharedResources = generator.renderSharedResources()
+    workDir = tempfile.mkdtemp(prefix="generatorBenchmark.", dir=targetDir)
+    oldCwd = os.getcwd()
+    latencies = []
+    stageTotals = collections.OrderedDict()
+    try:
+        os.chdir(workDir)
+        for index in range(warmupCount + projectCount):
+            args = argParser.parse_args(["Project" + str(index)] + generatorArgv + ["--profile"])
+            startTime = time.perf_counter()
+            tree = generator.generateProject(args, sharedResources)
+            elapsed = time.perf_counter() - startTime
+            if index < warmupCount:
+                continue
+            latencies.append(elapsed * 1000)
+            for stage in tree.profiler.stages:
+                stageTotals[stage["stage"]] = stageTotals.get(stage["stage"], 0.0) + stage["ms"]
+    finally:
+        os.chdir(oldCwd)
+        shutil.rmtree(workDir, ignore_errors=True)
+
+    totalMs = sum(latencies)
+    latencies.sort()
+    return { "directory" : targetDir, "projects" : projectCount, \
+             "projectsPerSecond" : round(projectCount / (totalMs / 1000), 1) if totalMs > 0 else 0.0, \
+             "meanMs" : round(totalMs / projectCount, 3) if projectCount else 0.0, \
+             "p50Ms" : round(percentile(latencies, 0.5), 3), "p99Ms" : round(percentile(latencies, 0.99), 3), \
+             "maxMs" : round(latencies[-1], 3) if latencies else 0.0, \
+             "stageMs" : { name : round(ms / projectCount, 3) for name, ms in stageTotals.items() } }
+
+
+def printResult(result):
+    print("==== {}: {} projects, {:.1f} projects/s, mean {:.3f} ms, p50 {:.3f} ms, p99 {:.3f} ms, max {:.3f} ms".format( \
+        result["directory"], result["projects"], result["projectsPerSecond"], result["meanMs"], result["p50Ms"], result["p99Ms"], result["maxMs"]))
+    for name, ms in result["stageMs"].items():
+        print("    {:<36} {:>10.3f} ms".format(name, ms))
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description="Measures how many projects per second generateCPPProjectStructure.py generates.")
+    argParser.add_argument("--projects", type=int, default=200, help="Number of measured projects per directory. Default is 200.")
+    argParser.add_argument("--warmup", type=int, default=10, help="Number of projects generated before measuring. Default is 10.")
+    argParser.add_argument("--tmpfsDir", default="/dev/shm", help="Memory backed directory. Default is /dev/shm, skipped when it doesn't exist.")
+    argParser.add_argument("--diskDir", default=".", help="Ordinary directory. Default is the current directory.")
+    argParser.add_argument("--generatorArgs", default="", help="Extra arguments passed to the generator, e.g. --generatorArgs=\"--unityBuild --testLayout subdirectory\".")
+    argParser.add_argument("--json", metavar="FILE", help="Dump the results as JSON into FILE.")
+    args = argParser.parse_args()
+
+    if args.projects <= 0 or args.warmup < 0:
+        argParser.error("--projects must be positive and --warmup can not be negative.")
+
+    generator = loadGenerator()
+    generatorArgv = shlex.split(args.generatorArgs)
+    results = []
+    for targetDir in [args.tmpfsDir, args.diskDir]:
+        if not os.path.isdir(targetDir):
+            print("Skipping missing directory: " + targetDir)
+            continue
+        result = runBenchmark(generator, targetDir, args.projects, args.warmup, generatorArgv)
+        printResult(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({ "generatorArgs" : generatorArgv, "results" : results }, f, indent=4)
+            f.write("\n")
+    if not results:
+        sys.exit(1)
@@ -5,206 +5,2361 @@ import sys
 import argparse
 from os.path import join
 from os import chmod
-from io import StringIO
+from io import StringIO, BytesIO
 import datetime
+import hashlib
+import json
+import marshal
+import re
+import tarfile
+import tempfile
+import zipfile
+import time
+import concurrent.futures
+import concurrent.futures.process
+import collections
+import contextlib
+import shlex
+import bisect
+import random
+import fcntl
+import struct
+import zlib
+
+def currentUmask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+defaultFileMode = 0o666 & ~currentUmask()
+defaultDirectoryMode = 0o755
+
+
+# The content is written next to its destination and renamed over it, so readers never see a half written file.
+def writeFileAtomically(path, content, mode):
+    directory, name = os.path.split(path)
+    fd, tmpPath = tempfile.mkstemp(prefix="." + name + ".", suffix=".tmp", dir=directory or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            os.fchmod(f.fileno(), mode if mode is not None else defaultFileMode)
+        os.replace(tmpPath, path)
+    except BaseException:
+        os.unlink(tmpPath)
+        raise
+
+
+# In-memory representation of a generated project. The generate* functions only add entries to it, the whole tree is
+# then flushed to the disk or streamed as an archive in a single pass.
+class ProjectTree:
+    ManifestFileName = ".generatorManifest.json"
+    ArchiveFormats = ["tar", "tar.gz", "zip"]
+
+    def __init__(self, base):
+        self.base = base
+        self.directories = []
+        self.files = {}
+        # Files that are not tracked by the manifest, e.g. the git repository of the project
+        self.unmanagedFiles = {}
+        # Files installed from the resource store when there is one
+        self.sharedFiles = set()
+        self.resourceStore = None
+        self.settings = {}
+        self.written = []
+        self.kept = []
+        # Files of the previous generation that aren't generated anymore
+        self.removed = []
+        self.stale = []
+        self.unchanged = 0
+        self.counters = collections.Counter()
+
+    def addDirectory(self, path):
+        if path not in self.directories:
+            self.directories.append(path)
+
+    def addFile(self, path, content, mode=None, userEditable=False):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        self.files[path] = (content, mode, userEditable)
+
+    def addSharedFile(self, path, content, mode=None):
+        self.addFile(path, content, mode)
+        self.sharedFiles.add(path)
+
+    def addUnmanagedFile(self, path, content, mode=None):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        self.unmanagedFiles[path] = (content, mode)
+
+    def manifestPath(self):
+        return join(self.base, ProjectTree.ManifestFileName)
+
+    def loadManifest(self):
+        try:
+            with open(self.manifestPath(), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def createManifest(self, fileEntries):
+        return { "settings" : self.settings, "files" : fileEntries }
+
+    def renderManifest(self, manifest):
+        return (json.dumps(manifest, indent=4, sort_keys=True) + "\n").encode("utf-8")
+
+    def fileEntry(self, content, mode, userEditable):
+        return { "sha256" : hashlib.sha256(content).hexdigest(), "mode" : mode, "userEditable" : userEditable }
+
+    def fileEntries(self):
+        return { os.path.relpath(path, self.base) : self.fileEntry(content, mode, userEditable) \
+                 for path, (content, mode, userEditable) in self.files.items() }
+
+    def createDirectories(self):
+        for path in self.directories:
+            os.makedirs(path, defaultDirectoryMode, True)
+            self.counters["mkdir"] += 1
+
+    def writeFile(self, path, content, mode):
+        if self.resourceStore is not None and path in self.sharedFiles:
+            self.counters[self.resourceStore.install(path, content, mode)] += 1
+        else:
+            writeFileAtomically(path, content, mode)
+            self.counters.update(open=1, write=1, chmod=1, rename=1, bytesWritten=len(content))
+        self.written.append(path)
+
+    def flush(self):
+        self.createDirectories()
+        for path, (content, mode, userEditable) in self.files.items():
+            self.writeFile(path, content, mode)
+        for path, (content, mode) in self.unmanagedFiles.items():
+            self.writeFile(path, content, mode)
+        self.writeFile(self.manifestPath(), self.renderManifest(self.createManifest(self.fileEntries())), None)
+        if self.resourceStore is not None:
+            self.resourceStore.writeReferences(self)
+
+    # Only writes the files whose content differs from the previous generation, files that were edited by the user
+    # since then are kept as they are.
+    def update(self):
+        self.createDirectories()
+        oldManifest = self.loadManifest()
+        oldEntries = oldManifest.get("files", {})
+        fileEntries = {}
+        for path, (content, mode, userEditable) in self.files.items():
+            relPath = os.path.relpath(path, self.base)
+            entry = self.fileEntry(content, mode, userEditable)
+            oldEntry = oldEntries.get(relPath)
+            fileEntries[relPath] = entry
+
+            self.counters["stat"] += 1
+            if not os.path.exists(path):
+                self.writeFile(path, content, mode)
+                continue
+
+            if userEditable:
+                fileEntries[relPath] = oldEntry or entry
+                self.unchanged += 1
+                continue
+
+            if oldEntry is None or oldEntry["sha256"] != entry["sha256"]:
+                with open(path, "rb") as f:
+                    diskHash = hashlib.sha256(f.read()).hexdigest()
+                self.counters.update(open=1, read=1)
+                if diskHash != entry["sha256"]:
+                    if oldEntry is not None and diskHash != oldEntry["sha256"]:
+                        fileEntries[relPath] = oldEntry
+                        self.kept.append(path)
+                    else:
+                        self.writeFile(path, content, mode)
+                    continue
+
+            # The mode of a linked resource belongs to the store
+            if mode is not None and not (self.resourceStore is not None and path in self.sharedFiles):
+                self.counters["stat"] += 1
+                if (os.stat(path).st_mode & 0o7777) != mode:
+                    chmod(path, mode)
+                    self.counters["chmod"] += 1
+            self.unchanged += 1
+
+        for path, (content, mode) in self.unmanagedFiles.items():
+            self.counters["stat"] += 1
+            if not os.path.exists(path):
+                self.writeFile(path, content, mode)
+
+        self.removeStaleFiles(oldEntries, fileEntries)
+
+        manifest = self.createManifest(fileEntries)
+        if manifest != oldManifest:
+            self.writeFile(self.manifestPath(), self.renderManifest(manifest), None)
+        if self.resourceStore is not None:
+            self.resourceStore.writeReferences(self)
+
+    # Unmodified files are removed, the source files and the edited ones are only reported
+    def removeStaleFiles(self, oldEntries, fileEntries):
+        for relPath, oldEntry in sorted(oldEntries.items()):
+            path = join(self.base, relPath)
+            self.counters["stat"] += 1
+            if relPath in fileEntries or not os.path.isfile(path):
+                continue
+            if not oldEntry.get("userEditable"):
+                with open(path, "rb") as f:
+                    diskHash = hashlib.sha256(f.read()).hexdigest()
+                self.counters.update(open=1, read=1)
+                if diskHash == oldEntry["sha256"]:
+                    os.remove(path)
+                    self.counters["unlink"] += 1
+                    self.removed.append(path)
+                    continue
+            self.stale.append(path)
+
+    def archiveEntries(self):
+        for path, (content, mode, userEditable) in self.files.items():
+            self.counters.update(archiveEntry=1, bytesArchived=len(content))
+            yield path, content, mode if mode is not None else 0o644
+        for path, (content, mode) in self.unmanagedFiles.items():
+            self.counters.update(archiveEntry=1, bytesArchived=len(content))
+            yield path, content, mode if mode is not None else 0o644
+        manifest = self.renderManifest(self.createManifest(self.fileEntries()))
+        self.counters.update(archiveEntry=1, bytesArchived=len(manifest))
+        yield self.manifestPath(), manifest, 0o644
+
+    def fileCount(self):
+        return len(self.files) + len(self.unmanagedFiles)
+
+    def contentBytes(self):
+        return sum(len(content) for content, mode, userEditable in self.files.values()) + \
+               sum(len(content) for content, mode in self.unmanagedFiles.values())
+
+    # Streams the whole tree into a tar or zip archive, "-" writes it to the standard output.
+    def writeArchive(self, target, archiveFormat):
+        stream = sys.stdout.buffer if target == "-" else open(target, "wb")
+        try:
+            if archiveFormat == "zip":
+                self.writeZipArchive(stream)
+            else:
+                self.writeTarArchive(stream, "w|gz" if archiveFormat == "tar.gz" else "w|")
+            stream.flush()
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+
+    def writeTarArchive(self, stream, tarMode):
+        timestamp = time.time()
+        with tarfile.open(fileobj=stream, mode=tarMode, format=tarfile.PAX_FORMAT) as archive:
+            for path in sorted(self.directories):
+                info = tarfile.TarInfo(path)
+                info.type = tarfile.DIRTYPE
+                info.mode = defaultDirectoryMode
+                info.mtime = timestamp
+                archive.addfile(info)
+            for path, content, mode in self.archiveEntries():
+                info = tarfile.TarInfo(path)
+                info.size = len(content)
+                info.mode = mode
+                info.mtime = timestamp
+                archive.addfile(info, BytesIO(content))
+
+    def writeZipArchive(self, stream):
+        timestamp = time.localtime()[:6]
+        with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+            for path in sorted(self.directories):
+                info = zipfile.ZipInfo(path + "/", timestamp)
+                info.external_attr = (0o40000 | defaultDirectoryMode) << 16
+                archive.writestr(info, b"")
+            for path, content, mode in self.archiveEntries():
+                info = zipfile.ZipInfo(path, timestamp)
+                info.external_attr = (0o100000 | mode) << 16
+                info.compress_type = zipfile.ZIP_DEFLATED
+                archive.writestr(info, content)
+
+
+# Content addressed store of the resources that every project shares. The projects get hardlinks to its objects, reflinks
+# when hardlinking isn't possible and copies when the file system can't do either. The objects are read-only, a hardlinked
+# object is shared by every project. The projects using an object are registered in refs, gc drops the unused objects.
+class ResourceStore:
+    FICLONE = 0x40049409
+
+    def __init__(self, root):
+        self.root = root
+
+    def objectMode(self, mode):
+        return (mode if mode is not None else defaultFileMode) & ~0o222
+
+    def objectKey(self, content, mode):
+        return hashlib.sha256(content).hexdigest() + "-" + format(self.objectMode(mode), "o")
+
+    def objectPath(self, key):
+        return join(self.root, "objects", key[:2], key[2:])
+
+    def referencePath(self, projectPath):
+        return join(self.root, "refs", hashlib.sha256(os.path.abspath(projectPath).encode("utf-8")).hexdigest() + ".json")
+
+    def storeObject(self, content, mode):
+        path = self.objectPath(self.objectKey(content, mode))
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), defaultDirectoryMode, True)
+            writeFileAtomically(path, content, self.objectMode(mode))
+        return path
+
+    # Returns how the file was installed: link, reflink or copy
+    def install(self, path, content, mode):
+        objectPath = self.storeObject(content, mode)
+        directory, name = os.path.split(path)
+        tmpPath = join(directory, "." + name + "." + str(os.getpid()) + ".link")
+        if os.path.lexists(tmpPath):
+            os.unlink(tmpPath)
+        try:
+            try:
+                os.link(objectPath, tmpPath)
+                method = "link"
+            except OSError:
+                method = self.cloneOrCopy(objectPath, tmpPath, content, mode)
+            os.replace(tmpPath, path)
+        except BaseException:
+            if os.path.lexists(tmpPath):
+                os.unlink(tmpPath)
+            raise
+        return method
+
+    def cloneOrCopy(self, objectPath, tmpPath, content, mode):
+        with open(tmpPath, "xb") as f:
+            with open(objectPath, "rb") as source:
+                try:
+                    fcntl.ioctl(f.fileno(), ResourceStore.FICLONE, source.fileno())
+                    method = "reflink"
+                except OSError:
+                    f.write(content)
+                    method = "copy"
+            os.fchmod(f.fileno(), mode if mode is not None else defaultFileMode)
+        return method
+
+    def writeReferences(self, tree):
+        files = { os.path.relpath(path, tree.base) : self.objectKey(*tree.files[path][:2]) for path in sorted(tree.sharedFiles) }
+        reference = { "project" : os.path.abspath(tree.base), "files" : files }
+        os.makedirs(join(self.root, "refs"), defaultDirectoryMode, True)
+        writeFileAtomically(self.referencePath(tree.base), (json.dumps(reference, indent=4, sort_keys=True) + "\n").encode("utf-8"), None)
+
+    # An object is alive while a generated project still has the file that was installed from it
+    def collectGarbage(self, dryRun=False):
+        liveKeys = set()
+        staleReferences = []
+        refsDir = join(self.root, "refs")
+        for name in sorted(os.listdir(refsDir)) if os.path.isdir(refsDir) else []:
+            path = join(refsDir, name)
+            try:
+                with open(path, "r") as f:
+                    reference = json.load(f)
+                project = reference["project"]
+                files = reference["files"]
+            except (OSError, ValueError, KeyError, TypeError):
+                staleReferences.append(path)
+                continue
+            if not os.path.isfile(join(project, ProjectTree.ManifestFileName)):
+                staleReferences.append(path)
+                continue
+            liveKeys.update(key for relPath, key in files.items() if os.path.lexists(join(project, relPath)))
+
+        garbage = []
+        objectsDir = join(self.root, "objects")
+        for prefix in sorted(os.listdir(objectsDir)) if os.path.isdir(objectsDir) else []:
+            for name in sorted(os.listdir(join(objectsDir, prefix))):
+                if prefix + name not in liveKeys:
+                    garbage.append(join(objectsDir, prefix, name))
+
+        freedBytes = sum(os.lstat(path).st_size for path in garbage)
+        if not dryRun:
+            for path in staleReferences + garbage:
+                os.unlink(path)
+            for prefix in os.listdir(objectsDir) if os.path.isdir(objectsDir) else []:
+                if not os.listdir(join(objectsDir, prefix)):
+                    os.rmdir(join(objectsDir, prefix))
+        return staleReferences, garbage, freedBytes
+
+
+# Records the wall time, the added files and bytes and the io counters of the tree for every stage of a generation.
+class GenerationProfiler:
+    def __init__(self, tree, enabled=True):
+        self.tree = tree
+        self.enabled = enabled
+        self.stages = []
+
+    def stage(self, name):
+        return self.measure(name) if self.enabled else contextlib.nullcontext()
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        fileCount = self.tree.fileCount()
+        contentBytes = self.tree.contentBytes()
+        counters = collections.Counter(self.tree.counters)
+        startTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - startTime
+            self.stages.append({ "stage" : name, "ms" : round(elapsed * 1000, 3), \
+                                 "files" : self.tree.fileCount() - fileCount, \
+                                 "bytes" : self.tree.contentBytes() - contentBytes, \
+                                 "counters" : dict(self.tree.counters - counters) })
+
+    def totalMs(self):
+        return round(sum(stage["ms"] for stage in self.stages), 3)
+
+    def report(self):
+        return { "project" : self.tree.base, "totalMs" : self.totalMs(), "stages" : self.stages }
+
+    def printReport(self, stream):
+        print("{:<36} {:>10} {:>6} {:>10}  {}".format("Stage", "ms", "files", "bytes", "io"), file=stream)
+        for stage in self.stages:
+            counters = " ".join(key + "=" + str(value) for key, value in sorted(stage["counters"].items()))
+            print("{:<36} {:>10.3f} {:>6} {:>10}  {}".format(stage["stage"], stage["ms"], stage["files"], stage["bytes"], counters), file=stream)
+        print("{:<36} {:>10.3f}".format("total", self.totalMs()), file=stream)
+
+
+## Templates
+class TemplateError(RuntimeError):
+    pass
+
+
+templateEngineVersion = "1"
+templateTagPattern = re.compile(r"^[ \t]*\{%\s*(.*?)\s*%\}[ \t]*(?:\n|\Z)|\{%\s*(.*?)\s*%\}|\{\{(?!\{)\s*(.*?)\s*\}\}", re.MULTILINE)
+templateIncludePattern = re.compile(r"^[ \t]*\{%\s*include\s+\"([^\"]+)\"\s*%\}[ \t]*(?:\n|\Z)", re.MULTILINE)
+templateNamePattern = re.compile(r"^[A-Za-z_]\w*(\.[A-Za-z_]\w*)*$")
+
+
+# Translates a template into the source of a python render function. Supported tags are {{ name }},
+# {% if [not] name %}, {% else %}, {% endif %}, {% for item in name %}, {% endfor %} and {% include "template" %}.
+# Tags standing alone on a line don't leave an empty line behind.
+def translateTemplate(source, templateName):
+    code = ["def render(context):", "    out = []", "    write = out.append"]
+    blocks = []
+    loopVariables = {}
+
+    def lookup(expression):
+        if not templateNamePattern.match(expression):
+            raise TemplateError("Invalid expression \"" + expression + "\" in template " + templateName)
+        parts = expression.split(".")
+        value = loopVariables[parts[0]] if parts[0] in loopVariables else "context[" + repr(parts[0]) + "]"
+        for part in parts[1:]:
+            value += "[" + repr(part) + "]"
+        return value
+
+    def emit(line):
+        code.append("    " * (len(blocks) + 1) + line)
+
+    position = 0
+    for match in templateTagPattern.finditer(source):
+        if match.start() > position:
+            emit("write(" + repr(source[position:match.start()]) + ")")
+        position = match.end()
+
+        if match.group(3) is not None:
+            emit("write(str(" + lookup(match.group(3)) + "))")
+            continue
+
+        words = (match.group(1) if match.group(1) is not None else match.group(2)).split()
+        if len(words) in [2, 3] and words[0] == "if":
+            emit("if " + ("not " if len(words) == 3 and words[1] == "not" else "") + lookup(words[-1]) + ":")
+            blocks.append("if")
+        elif words == ["else"] and blocks and blocks[-1] == "if":
+            blocks.pop()
+            emit("else:")
+            blocks.append("else")
+        elif words == ["endif"] and blocks and blocks[-1] in ["if", "else"]:
+            emit("pass")
+            blocks.pop()
+        elif len(words) == 4 and words[0] == "for" and words[2] == "in" and templateNamePattern.match(words[1]):
+            variable = "loop" + str(len(loopVariables))
+            emit("for " + variable + " in " + lookup(words[3]) + ":")
+            blocks.append(("for", words[1], loopVariables.get(words[1])))
+            loopVariables[words[1]] = variable
+        elif words == ["endfor"] and blocks and blocks[-1][0] == "for":
+            emit("pass")
+            block = blocks.pop()
+            if block[2] is None:
+                del loopVariables[block[1]]
+            else:
+                loopVariables[block[1]] = block[2]
+        else:
+            raise TemplateError("Unexpected tag \"" + match.group(0).strip() + "\" in template " + templateName)
+
+    if blocks:
+        raise TemplateError("Unclosed block in template " + templateName)
+    if position < len(source):
+        emit("write(" + repr(source[position:]) + ")")
+    code.append("    return \"\".join(out)")
+    return "\n".join(code) + "\n"
+
+
+# Compiled templates are shared by every loader, keyed by the hash of their expanded source.
+compiledTemplates = {}
+templateLoaders = {}
+
+
+class TemplateLoader:
+    def __init__(self, templateDir=None, cacheDir=None):
+        # Templates missing from the directory fall back to the builtin ones, a missing directory is most likely a typo
+        if templateDir is not None and not os.path.isdir(templateDir):
+            raise TemplateError("The template directory \"" + templateDir + "\" doesn't exist.")
+        self.templateDir = templateDir
+        self.cacheDir = cacheDir
+        self.renderers = {}
+
+    def source(self, name, includedFrom=()):
+        if name in includedFrom:
+            raise TemplateError("Recursive include of template " + name)
+
+        source = None
+        if self.templateDir is not None and os.path.isfile(join(self.templateDir, name)):
+            with open(join(self.templateDir, name), "r") as f:
+                source = f.read()
+        elif name in builtinTemplates:
+            source = builtinTemplates[name]
+        else:
+            raise TemplateError("Unknown template " + name)
+
+        return templateIncludePattern.sub(lambda match: self.source(match.group(1), includedFrom + (name,)), source)
+
+    def cachePath(self, key):
+        return join(self.cacheDir, key + "." + sys.implementation.cache_tag + ".bin")
+
+    def loadCode(self, key):
+        try:
+            with open(self.cachePath(key), "rb") as f:
+                return marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+    def storeCode(self, key, code):
+        try:
+            os.makedirs(self.cacheDir, defaultDirectoryMode, True)
+            fd, tmpPath = tempfile.mkstemp(prefix="." + key, suffix=".tmp", dir=self.cacheDir)
+            with os.fdopen(fd, "wb") as f:
+                marshal.dump(code, f)
+            os.replace(tmpPath, self.cachePath(key))
+        except OSError:
+            pass
+
+    def compile(self, name):
+        source = self.source(name)
+        key = hashlib.sha256((templateEngineVersion + "\0" + source).encode("utf-8")).hexdigest()
+        if key in compiledTemplates:
+            return compiledTemplates[key]
+
+        code = self.loadCode(key) if self.cacheDir is not None else None
+        if code is None:
+            code = compile(translateTemplate(source, name), "<template " + name + ">", "exec")
+            if self.cacheDir is not None:
+                self.storeCode(key, code)
+
+        namespace = {}
+        exec(code, namespace)
+        compiledTemplates[key] = namespace["render"]
+        return namespace["render"]
+
+    def render(self, name, context):
+        renderer = self.renderers.get(name)
+        if renderer is None:
+            renderer = self.compile(name)
+            self.renderers[name] = renderer
+        try:
+            return renderer(context)
+        except KeyError as e:
+            raise TemplateError("Undefined variable " + str(e) + " in template " + name)
+
+
+def templateLoader(args):
+    key = (args.templateDir, args.templateCacheDir)
+    loader = templateLoaders.get(key)
+    if loader is None:
+        loader = TemplateLoader(*key)
+        templateLoaders[key] = loader
+    return loader
+
+
+def createTemplateContext(paths, args):
+    def listDirPath(pathName):
+        return join("${CMAKE_CURRENT_LIST_DIR}", os.path.relpath(paths[pathName], paths["base"]))
+
+    year = datetime.datetime.now().year
+    codebase = createSyntheticCodebase(args) if args.syntheticSources else None
+    return { "projectName" : args.projectName, "projectNameUpper" : args.projectName.upper(), \
+             "projectNameLower" : args.projectName.lower(), "cxxVersion" : args.cppVersion, \
+             "minCMakeVersion" : args.minCMakeVersion, "isLibrary" : args.defaultTargetType == "lib", \
+             "targetDestination" : "lib" if args.defaultTargetType == "lib" else "bin", \
+             "copyrightYear" : year, "copyrightEndYear" : year + 1, \
+             "publicHeadersDir" : listDirPath("pubHeaders"), "privateHeadersDir" : listDirPath("privHeaders"), \
+             "srcDir" : listDirPath("src"), "publicIncludeDir" : listDirPath("pubInc"), "privateIncludeDir" : listDirPath("privInc"), \
+             "projectPath" : join("${PROJECT_ROOT}", paths["base"]), "configResPath" : join("${PROJECT_ROOT}", paths["configRes"]), \
+             "buildPath" : join("${BUILD_ROOT}", args.projectName), \
+             "compilerLauncher" : args.compilerLauncher, "compilerLauncherGuarded" : not cmakeSupports(args, "compilerLauncher"), \
+             "unityBuild" : args.unityBuild is not None, "unityBuildBatchSize" : args.unityBuild, \
+             "unityBuildGuarded" : not cmakeSupports(args, "unityBuild"), \
+             "precompileHeaders" : [precompileHeaderArgument(header) for header in args.pch], \
+             "precompileHeadersGuarded" : not cmakeSupports(args, "pch"), \
+             "testSubdirectory" : args.testLayout == "subdirectory", "testTimeout" : args.testTimeout, \
+             "ctestParallel" : args.ctestParallel or "", "gtestDiscoverTestsGuarded" : not cmakeSupports(args, "gtestDiscoverTests"), \
+             "gitAuthorName" : args.gitAuthorName, "gitAuthorEmail" : args.gitAuthorEmail, "gitInitialCommit" : args.gitInit, \
+             "linkSharedResources" : args.resourceStore is not None, \
+             "dependencies" : [{ "name" : name, "nameUpper" : name.upper(), "nameLower" : name.lower() } for name in args.dependsOn], \
+             "jobPools" : args.jobPools, "compileJobMemory" : args.compileJobMemory, "linkJobMemory" : args.linkJobMemory, \
+             "lto" : args.lto, "ltoGuarded" : not cmakeSupports(args, "ipo"), \
+             "pgo" : args.pgo, "pgoTrainingCommand" : shlex.quote(pgoTrainingCommand(args)), \
+             "pgoNestedTests" : pgoTrainsNestedTests(args), \
+             "withTracing" : args.withTracing, \
+             "withBenchmarks" : args.withBenchmarks, "benchmarkThreshold" : args.benchmarkThreshold, \
+             "benchmarkCxxVersion" : args.cppVersion if args.cppVersion in ["11", "14", "17"] else "11", \
+             "syntheticCodebase" : codebase, "templateDepth" : args.templateDepth }
+
+
+# Deterministic layout of a synthetic codebase: the sources and headers are split into modules, every module depends on
+# some of the modules before it, so the includes of the headers form an acyclic graph.
+def createSyntheticCodebase(args):
+    rng = random.Random(args.seed)
+    sourceCount = args.syntheticSources
+    headerCount = args.syntheticHeaders or sourceCount
+    moduleCount = max(1, min(args.syntheticModules, sourceCount, headerCount))
+    projectNameLower = args.projectName.lower()
+
+    def moduleRange(count, module):
+        return (module * count // moduleCount, (module + 1) * count // moduleCount)
+
+    modules = []
+    for module in range(moduleCount):
+        dependencyCount = min(module, rng.randint(1, args.includeFanOut)) if module > 0 else 0
+        modules.append({ "name" : "module" + str(module), "dependsOn" : sorted(rng.sample(range(module), dependencyCount)), \
+                         "headers" : moduleRange(headerCount, module), "sources" : moduleRange(sourceCount, module) })
+
+    # Picks the included headers uniformly from a list of header index ranges
+    def pickHeaders(ranges):
+        offsets = []
+        total = 0
+        for begin, end in ranges:
+            offsets.append(total)
+            total += end - begin
+        picked = []
+        for index in sorted(rng.sample(range(total), min(total, args.includeFanOut))):
+            rangeIndex = bisect.bisect_right(offsets, index) - 1
+            picked.append(headers[ranges[rangeIndex][0] + index - offsets[rangeIndex]])
+        return [{ "path" : header["includePath"], "function" : header["qualifiedFunction"] } for header in picked]
+
+    headers = []
+    sources = []
+    for module in modules:
+        dependencyRanges = [modules[dependency]["headers"] for dependency in module["dependsOn"]]
+        begin, end = module["headers"]
+        for index in range(begin, end):
+            name = "header" + str(index)
+            headers.append({ "path" : join(module["name"], name + ".h"), "includePath" : join(projectNameLower, module["name"], name + ".h"), \
+                             "module" : module["name"], "guard" : "SYNTHETIC_" + args.projectName.upper() + "_" + module["name"].upper() + "_" + name.upper() + "_H", \
+                             "typeName" : "Header" + str(index) + "Chain", "functionName" : name + "Value", \
+                             "qualifiedFunction" : "::synthetic_" + projectNameLower + "::" + module["name"] + "::" + name + "Value", \
+                             "salt" : rng.randint(1, 1 << 30) })
+            headers[-1]["includes"] = pickHeaders([(begin, index)] + dependencyRanges)
+        begin, end = module["sources"]
+        for index in range(begin, end):
+            name = "source" + str(index)
+            sources.append({ "path" : join(module["name"], name + ".cpp"), "module" : module["name"], "functionName" : name + "Value", \
+                             "includes" : pickHeaders([module["headers"]] + dependencyRanges) })
+    return { "modules" : modules, "headers" : headers, "sources" : sources }
+
+
+# The command is evaluated by build.sh in the instrumented build directory, by default it runs the benchmarks, the tests
+# or the executable of the project
+def pgoTrainingCommand(args):
+    if args.pgoTrainingCommand:
+        return args.pgoTrainingCommand
+    if args.withBenchmarks:
+        return "\"${PGO_GENERATE_PATH}/benchmark/" + args.projectName + "_benchmark\""
+    if args.testLayout == "subdirectory":
+        return "\"${PGO_GENERATE_PATH}/test/" + args.projectName + "_test\""
+    if args.defaultTargetType == "exec":
+        return "\"${PGO_GENERATE_PATH}/" + args.projectName + "\""
+    return "\"${PGO_GENERATE_PATH}/" + args.projectName + "_test\""
+
+
+# A library with nested tests has nothing else to train with, the instrumented build is the test tree that builds its own
+# copy of the project
+def pgoTrainsNestedTests(args):
+    return not args.pgoTrainingCommand and not args.withBenchmarks and args.testLayout == "nested" and args.defaultTargetType == "lib"
+
+
+# First CMake version of the optional build features
+cmakeFeatureVersions = { "compilerLauncher" : (3, 4), "unityBuild" : (3, 16), "pch" : (3, 16), "gtestDiscoverTests" : (3, 10), "ipo" : (3, 9) }
+
+
+def versionTuple(version):
+    parts = []
+    for part in version.split("."):
+        match = re.match(r"\d+", part)
+        if match is None:
+            break
+        parts.append(int(match.group(0)))
+    return tuple(parts)
+
+
+# Features that are newer than the minimum CMake version are guarded by a version check in the generated files
+def cmakeSupports(args, feature):
+    return versionTuple(args.minCMakeVersion) >= cmakeFeatureVersions[feature]
+
+
+# Angle bracket and quoted headers are used as include directives, other headers are files of the project
+def precompileHeaderArgument(header):
+    if header.startswith("\""):
+        return "[[" + header + "]]"
+    if header.startswith("<"):
+        return "\"" + header + "\""
+    if "/" not in header and "." not in header:
+        return "\"<" + header + ">\""
+    return "\"" + join("${CMAKE_CURRENT_LIST_DIR}", header) + "\""
+
+
+builtinTemplates = {}
+
+builtinTemplates["CMakeLists.txt"] = """\
+# Copyright {{ copyrightYear }} - {{ copyrightEndYear }} Szilard Orban, <devszilardo@gmail.com>
+# All rights reserved.
+cmake_minimum_required(VERSION {{ minCMakeVersion }})
+{% include "cmake/project.cmake" %}
+"""
+
+builtinTemplates["cmake/project.cmake"] = """\
+project("{{ projectName }}" VERSION 0.1.0 LANGUAGES CXX)
+
+set(CMAKE_CXX_STANDARD {{ cxxVersion }})
+set(CXX_STANDARD_REQUIRED ON)
+
+list(APPEND CMAKE_MODULE_PATH "${CMAKE_CURRENT_LIST_DIR}/../../../cmakeSearchModule/")
+#add_definitions("-DDEVELOPMENT_BUILD")
+option({{ projectNameUpper }}_TIME_TRACE "Compile with -ftime-trace when using clang." OFF)
+{% include "cmake/compilerLauncher.cmake" %}
+{% include "cmake/jobPools.cmake" %}
+
+
+# The source lists are generated, the sync subcommand of the generator keeps them up to date
+include("${CMAKE_CURRENT_LIST_DIR}/sources.cmake")
+{% if precompileHeaders %}
+set({{ projectNameUpper }}_PRECOMPILE_HEADERS
+{% for header in precompileHeaders %}
+    {{ header }}
+{% endfor %}
+)
+{% endif %}
+
+{% if isLibrary %}
+add_library(${PROJECT_NAME}  ${{{ projectNameUpper }}_SRC} ${{{ projectNameUpper }}_PUBLIC_HEADERS} ${{{ projectNameUpper }}_PRIVATE_HEADERS})
+if(BUILD_SHARED_LIBS)
+   set(INSTALL_TARGET_TYPE "LIBRARY")
+else()
+   set(INSTALL_TARGET_TYPE "ARCHIVE")
+endif()
+{% else %}
+add_executable(${PROJECT_NAME}  ${{{ projectNameUpper }}_SRC} ${{{ projectNameUpper }}_PUBLIC_HEADERS} ${{{ projectNameUpper }}_PRIVATE_HEADERS})
+set(INSTALL_TARGET_TYPE "")
+{% endif %}
+set_target_properties(${PROJECT_NAME} PROPERTIES PUBLIC_HEADER "${{{ projectNameUpper }}_PUBLIC_HEADERS}")
+target_include_directories(${PROJECT_NAME} PUBLIC
+   $<BUILD_INTERFACE:{{ publicIncludeDir }}>
+   $<INSTALL_INTERFACE:{{ publicIncludeDir }}>
+   PRIVATE {{ privateIncludeDir }})
+{% for dependency in dependencies %}
+find_path({{ dependency.nameUpper }}_INCLUDE_DIR "{{ dependency.name }}/{{ dependency.nameLower }}.h" HINTS "${CMAKE_INSTALL_PREFIX}/include")
+find_library({{ dependency.nameUpper }}_LIBRARY "{{ dependency.name }}" HINTS "${CMAKE_INSTALL_PREFIX}/lib")
+if(NOT {{ dependency.nameUpper }}_INCLUDE_DIR)
+    message(FATAL_ERROR "{{ dependency.name }} is not installed, build and install it first or build the whole workspace.")
+endif()
+target_include_directories(${PROJECT_NAME} PUBLIC "${{{ dependency.nameUpper }}_INCLUDE_DIR}")
+if({{ dependency.nameUpper }}_LIBRARY)
+    target_link_libraries(${PROJECT_NAME} PUBLIC "${{{ dependency.nameUpper }}_LIBRARY}")
+endif()
+{% endfor %}
+{% include "cmake/targetBuildAcceleration.cmake" %}
+{% include "cmake/targetTimeTrace.cmake" %}
+{% include "cmake/targetOptimization.cmake" %}
+{% if withTracing %}
+option({{ projectNameUpper }}_TRACING "Record the {{ projectNameUpper }}_TRACE_* scopes, when OFF the macros compile to nothing." ON)
+if({{ projectNameUpper }}_TRACING)
+    find_package(Threads REQUIRED)
+    target_compile_definitions(${PROJECT_NAME} PUBLIC {{ projectNameUpper }}_TRACING_ENABLED=1)
+    target_link_libraries(${PROJECT_NAME} PUBLIC Threads::Threads)
+endif()
+{% endif %}
+install(TARGETS ${PROJECT_NAME}  ${INSTALL_TARGET_TYPE} DESTINATION "{{ targetDestination }}"  PUBLIC_HEADER DESTINATION "include/{{ projectName }}")
+
+{% if testSubdirectory %}
+option({{ projectNameUpper }}_BUILD_TESTS "Add the test target and register the tests in CTest, the target is only built on request(build.sh test)." OFF)
+if({{ projectNameUpper }}_BUILD_TESTS)
+    enable_testing()
+    add_subdirectory("${CMAKE_CURRENT_LIST_DIR}/code/test" "${CMAKE_CURRENT_BINARY_DIR}/test" EXCLUDE_FROM_ALL)
+endif()
+{% endif %}
+{% if withBenchmarks %}
+option({{ projectNameUpper }}_BUILD_BENCHMARKS "Add the Google Benchmark target, it is only built on request(build.sh bench)." OFF)
+if({{ projectNameUpper }}_BUILD_BENCHMARKS)
+    add_subdirectory("${CMAKE_CURRENT_LIST_DIR}/code/benchmark" "${CMAKE_CURRENT_BINARY_DIR}/benchmark" EXCLUDE_FROM_ALL)
+endif()
+{% endif %}
+"""
+
+builtinTemplates["cmake/sources.cmake"] = """\
+# Generated, 'generateCPPProjectStructure.py sync' rewrites it when files are added, removed or renamed.
+set({{ projectNameUpper }}_SRC
+{% for source in sources %}
+    "{{ source }}"
+{% endfor %}
+)
+set({{ projectNameUpper }}_PUBLIC_HEADERS
+{% for header in publicHeaders %}
+    "{{ header }}"
+{% endfor %}
+)
+set({{ projectNameUpper }}_PRIVATE_HEADERS
+{% for header in privateHeaders %}
+    "{{ header }}"
+{% endfor %}
+)
+"""
+
+builtinTemplates["cmake/compilerLauncher.cmake"] = """\
+{% if compilerLauncher %}
+
+find_program({{ projectNameUpper }}_COMPILER_LAUNCHER {{ compilerLauncher }})
+{% if compilerLauncherGuarded %}
+if({{ projectNameUpper }}_COMPILER_LAUNCHER AND NOT CMAKE_VERSION VERSION_LESS 3.4)
+{% else %}
+if({{ projectNameUpper }}_COMPILER_LAUNCHER)
+{% endif %}
+    set(CMAKE_CXX_COMPILER_LAUNCHER "${{{ projectNameUpper }}_COMPILER_LAUNCHER}")
+else()
+    message(STATUS "{{ compilerLauncher }} is not available, building without a compiler launcher.")
+endif()
+{% endif %}
+"""
+
+# Shared by the main and the test target, ${PROJECT_NAME} is the target that was created last.
+builtinTemplates["cmake/targetBuildAcceleration.cmake"] = """\
+{% if unityBuild %}
+{% if unityBuildGuarded %}
+if(NOT CMAKE_VERSION VERSION_LESS 3.16)
+    set_target_properties(${PROJECT_NAME} PROPERTIES UNITY_BUILD ON UNITY_BUILD_BATCH_SIZE {{ unityBuildBatchSize }})
+endif()
+{% else %}
+set_target_properties(${PROJECT_NAME} PROPERTIES UNITY_BUILD ON UNITY_BUILD_BATCH_SIZE {{ unityBuildBatchSize }})
+{% endif %}
+{% endif %}
+{% if precompileHeaders %}
+{% if precompileHeadersGuarded %}
+if(NOT CMAKE_VERSION VERSION_LESS 3.16)
+    target_precompile_headers(${PROJECT_NAME} PRIVATE ${{{ projectNameUpper }}_PRECOMPILE_HEADERS})
+endif()
+{% else %}
+target_precompile_headers(${PROJECT_NAME} PRIVATE ${{{ projectNameUpper }}_PRECOMPILE_HEADERS})
+{% endif %}
+{% endif %}
+"""
+
+builtinTemplates["cmake/jobPools.cmake"] = """\
+{% if jobPools %}
+# Ninja job pools, build.sh sizes them from the cores and the available memory
+set({{ projectNameUpper }}_COMPILE_JOBS 0 CACHE STRING "Maximum number of concurrent compile jobs with Ninja, 0 means no limit.")
+set({{ projectNameUpper }}_LINK_JOBS 0 CACHE STRING "Maximum number of concurrent link jobs with Ninja, 0 means no limit.")
+if({{ projectNameUpper }}_COMPILE_JOBS GREATER 0)
+    set_property(GLOBAL APPEND PROPERTY JOB_POOLS compile_pool=${{{ projectNameUpper }}_COMPILE_JOBS})
+    set(CMAKE_JOB_POOL_COMPILE compile_pool)
+endif()
+if({{ projectNameUpper }}_LINK_JOBS GREATER 0)
+    set_property(GLOBAL APPEND PROPERTY JOB_POOLS link_pool=${{{ projectNameUpper }}_LINK_JOBS})
+    set(CMAKE_JOB_POOL_LINK link_pool)
+endif()
+{% endif %}
+"""
+builtinTemplates["cmake/targetOptimization.cmake"] = """\
+{% if lto %}
+option({{ projectNameUpper }}_LTO "Build with link time optimization when the compiler supports it." ON)
+{% if ltoGuarded %}
+if({{ projectNameUpper }}_LTO AND NOT CMAKE_VERSION VERSION_LESS 3.9)
+{% else %}
+if({{ projectNameUpper }}_LTO)
+{% endif %}
+    cmake_policy(SET CMP0069 NEW)
+    include(CheckIPOSupported)
+    check_ipo_supported(RESULT {{ projectNameUpper }}_IPO_SUPPORTED OUTPUT {{ projectNameUpper }}_IPO_ERROR LANGUAGES CXX)
+    if({{ projectNameUpper }}_IPO_SUPPORTED)
+        set_target_properties(${PROJECT_NAME} PROPERTIES INTERPROCEDURAL_OPTIMIZATION ON)
+    else()
+        message(STATUS "Link time optimization is not supported: ${{{ projectNameUpper }}_IPO_ERROR}")
+    endif()
+endif()
+{% endif %}
+{% if pgo %}
+set({{ projectNameUpper }}_PGO_STAGE "" CACHE STRING "Profile guided optimization stage, generate: instrumented build, use: build optimized with the training profiles.")
+set({{ projectNameUpper }}_PGO_PROFILE_DIR "${CMAKE_BINARY_DIR}/pgoProfiles" CACHE PATH "Directory of the training profiles.")
+if({{ projectNameUpper }}_PGO_STAGE)
+    if(CMAKE_CXX_COMPILER_ID MATCHES "Clang")
+        set({{ projectNameUpper }}_PGO_GENERATE_FLAGS "-fprofile-generate=${{{ projectNameUpper }}_PGO_PROFILE_DIR}")
+        set({{ projectNameUpper }}_PGO_USE_FLAGS "-fprofile-use=${{{ projectNameUpper }}_PGO_PROFILE_DIR}/merged.profdata")
+    else()
+        set({{ projectNameUpper }}_PGO_GENERATE_FLAGS "-fprofile-generate=${{{ projectNameUpper }}_PGO_PROFILE_DIR}")
+        set({{ projectNameUpper }}_PGO_USE_FLAGS "-fprofile-use=${{{ projectNameUpper }}_PGO_PROFILE_DIR}" "-fprofile-correction" "-Wno-missing-profile")
+        # gcc names the profiles after the object paths, without the build directory they match between the stages
+        include(CheckCXXCompilerFlag)
+        check_cxx_compiler_flag("-fprofile-prefix-path=${CMAKE_BINARY_DIR}" {{ projectNameUpper }}_PGO_PREFIX_PATH)
+        if({{ projectNameUpper }}_PGO_PREFIX_PATH)
+            list(APPEND {{ projectNameUpper }}_PGO_GENERATE_FLAGS "-fprofile-prefix-path=${CMAKE_BINARY_DIR}")
+            list(APPEND {{ projectNameUpper }}_PGO_USE_FLAGS "-fprofile-prefix-path=${CMAKE_BINARY_DIR}")
+        endif()
+    endif()
+    if({{ projectNameUpper }}_PGO_STAGE STREQUAL "generate")
+        target_compile_options(${PROJECT_NAME} PRIVATE ${{{ projectNameUpper }}_PGO_GENERATE_FLAGS})
+        target_link_libraries(${PROJECT_NAME} PUBLIC ${{{ projectNameUpper }}_PGO_GENERATE_FLAGS})
+    elseif({{ projectNameUpper }}_PGO_STAGE STREQUAL "use")
+        target_compile_options(${PROJECT_NAME} PRIVATE ${{{ projectNameUpper }}_PGO_USE_FLAGS})
+    endif()
+endif()
+{% endif %}
+"""
+builtinTemplates["cmake/targetTimeTrace.cmake"] = """\
+if({{ projectNameUpper }}_TIME_TRACE AND CMAKE_CXX_COMPILER_ID MATCHES "Clang")
+    target_compile_options(${PROJECT_NAME} PRIVATE -ftime-trace)
+endif()
+"""
+
+builtinTemplates["test/CMakeLists.txt"] = """\
+{% if testSubdirectory %}
+{% include "test/CMakeLists.subdirectory.txt" %}
+{% else %}
+{% include "test/CMakeLists.nested.txt" %}
+{% endif %}
+"""
+
+# Standalone test project that builds its own copy of the main project
+builtinTemplates["test/CMakeLists.nested.txt"] = """
+include("${CMAKE_CURRENT_LIST_DIR}/../../CMakeLists.txt")
+
+cmake_minimum_required(VERSION 3.8.2)
+set(PROJECT_NAME "{{ projectName }}_test")
+
+project(${PROJECT_NAME} CXX)
+
+set(CMAKE_CXX_STANDARD 14)
+list(APPEND CMAKE_MODULE_PATH "${CMAKE_CURRENT_LIST_DIR}/../../../cmakeSearchModule/")
+
+set(TEST_SOURCES "main.cpp")
+{% include "test/tracingSources.cmake" %}
+add_executable(${PROJECT_NAME} ${TEST_SOURCES})
+{% include "cmake/targetBuildAcceleration.cmake" %}
+{% include "cmake/targetTimeTrace.cmake" %}
+
+find_package(google_test REQUIRED)
+
+set(LIBS "${google_test_LIBRARIES}" "pthread")
+{% if isLibrary %}
+list(APPEND LIBS "{{ projectName }}")
+{% endif %}
+target_link_libraries(${PROJECT_NAME} ${LIBS})
+target_include_directories(${PROJECT_NAME} PRIVATE ${google_test_INCLUDE_DIRS})
+{% include "test/tracingTarget.cmake" %}
+"""
+
+# Test directory added by the main project, the tests are registered in CTest
+builtinTemplates["test/CMakeLists.subdirectory.txt"] = """\
+project("{{ projectName }}_test" CXX)
+
+list(APPEND CMAKE_MODULE_PATH "${CMAKE_CURRENT_LIST_DIR}/../../../cmakeSearchModule/")
+
+set(TEST_SOURCES "main.cpp")
+{% include "test/tracingSources.cmake" %}
+add_executable(${PROJECT_NAME} ${TEST_SOURCES})
+{% include "cmake/targetBuildAcceleration.cmake" %}
+{% include "cmake/targetTimeTrace.cmake" %}
+
+find_package(google_test REQUIRED)
+
+set(LIBS "${google_test_LIBRARIES}" "pthread")
+{% if isLibrary %}
+list(APPEND LIBS "{{ projectName }}")
+{% endif %}
+target_link_libraries(${PROJECT_NAME} ${LIBS})
+target_include_directories(${PROJECT_NAME} PRIVATE ${google_test_INCLUDE_DIRS})
+{% include "test/tracingTarget.cmake" %}
+
+set({{ projectNameUpper }}_TEST_TIMEOUT {{ testTimeout }} CACHE STRING "Timeout of a single test in seconds.")
+{% if gtestDiscoverTestsGuarded %}
+if(NOT CMAKE_VERSION VERSION_LESS 3.10)
+    include(GoogleTest)
+    gtest_discover_tests(${PROJECT_NAME} PROPERTIES TIMEOUT ${{{ projectNameUpper }}_TEST_TIMEOUT})
+else()
+    add_test(NAME ${PROJECT_NAME} COMMAND ${PROJECT_NAME})
+    set_tests_properties(${PROJECT_NAME} PROPERTIES TIMEOUT ${{{ projectNameUpper }}_TEST_TIMEOUT})
+endif()
+{% else %}
+include(GoogleTest)
+gtest_discover_tests(${PROJECT_NAME} PROPERTIES TIMEOUT ${{{ projectNameUpper }}_TEST_TIMEOUT})
+{% endif %}
+"""
+
+# The tracing test of a library uses the tracing of the library, an executable can't be linked so its sources are compiled in
+builtinTemplates["test/tracingSources.cmake"] = """\
+{% if withTracing %}
+list(APPEND TEST_SOURCES "tracingTest.cpp")
+{% if not isLibrary %}
+list(APPEND TEST_SOURCES "${CMAKE_CURRENT_LIST_DIR}/../src/tracing.cpp")
+{% endif %}
+{% endif %}
+"""
+
+builtinTemplates["test/tracingTarget.cmake"] = """\
+{% if withTracing %}
+set({{ projectNameUpper }}_TRACING_OVERHEAD_LIMIT 500 CACHE STRING "Limit of the measured cost of a trace scope in ns, 0 only records it(sanitizer, valgrind or loaded CI builds).")
+target_compile_definitions(${PROJECT_NAME} PRIVATE {{ projectNameUpper }}_TRACING_OVERHEAD_LIMIT=${{{ projectNameUpper }}_TRACING_OVERHEAD_LIMIT})
+{% if not isLibrary %}
+target_include_directories(${PROJECT_NAME} PRIVATE "${CMAKE_CURRENT_LIST_DIR}/../public/include")
+if({{ projectNameUpper }}_TRACING)
+    target_compile_definitions(${PROJECT_NAME} PRIVATE {{ projectNameUpper }}_TRACING_ENABLED=1)
+endif()
+{% endif %}
+{% endif %}
+"""
+
+builtinTemplates["test/main.cpp"] = """
+#include "gtest/gtest.h"
+
+int main(int argc, char** argv)
+{
+    ::testing::InitGoogleTest(&argc, argv);
+    return RUN_ALL_TESTS();
+}
+"""
+
+# Benchmark directory added by the main project
+builtinTemplates["benchmark/CMakeLists.txt"] = """\
+project("{{ projectName }}_benchmark" CXX)
+
+list(APPEND CMAKE_MODULE_PATH "${CMAKE_CURRENT_LIST_DIR}/../../../cmakeSearchModule/")
+
+set(BENCHMARK_SOURCES "main.cpp")
+add_executable(${PROJECT_NAME} ${BENCHMARK_SOURCES})
+set_target_properties(${PROJECT_NAME} PROPERTIES CXX_STANDARD {{ benchmarkCxxVersion }})
+{% include "cmake/targetBuildAcceleration.cmake" %}
+
+# The config package of Google Benchmark is preferred, a google_benchmark search module is the fallback
+find_package(benchmark QUIET)
+if(benchmark_FOUND)
+    set(LIBS benchmark::benchmark)
+else()
+    find_package(google_benchmark REQUIRED)
+    set(LIBS "${google_benchmark_LIBRARIES}" "pthread")
+    target_include_directories(${PROJECT_NAME} PRIVATE ${google_benchmark_INCLUDE_DIRS})
+endif()
+{% if isLibrary %}
+list(APPEND LIBS "{{ projectName }}")
+{% endif %}
+target_link_libraries(${PROJECT_NAME} ${LIBS})
+"""
+
+builtinTemplates["benchmark/main.cpp"] = """\
+#include "benchmark/benchmark.h"
+
+#include <string>
+
+static void {{ projectName }}StringCopy(benchmark::State& state)
+{
+    std::string source(static_cast<size_t>(state.range(0)), 'x');
+    for (auto _ : state)
+    {
+        std::string copy(source);
+        benchmark::DoNotOptimize(copy.data());
+    }
+    state.SetBytesProcessed(static_cast<int64_t>(state.iterations()) * state.range(0));
+}
+BENCHMARK({{ projectName }}StringCopy)->Arg(64)->Arg(4096);
+
+int main(int argc, char** argv)
+{
+    ::benchmark::Initialize(&argc, argv);
+    if (::benchmark::ReportUnrecognizedArguments(argc, argv))
+    {
+        return 1;
+    }
+    ::benchmark::RunSpecifiedBenchmarks();
+    return 0;
+}
+"""
+
+# Low overhead tracing facility, added with --withTracing
+builtinTemplates["tracing/tracing.h"] = """\
+#ifndef {{ projectNameUpper }}_TRACING_H
+#define {{ projectNameUpper }}_TRACING_H
+
+#include <cstddef>
+#include <cstdint>
+#include <ostream>
+
+// {{ projectNameUpper }}_TRACE_SCOPE("name") records the duration of the enclosing scope into a lock-free ring buffer of the
+// calling thread, writeChromeTrace dumps the buffers as Chrome trace event JSON(chrome://tracing, ui.perfetto.dev).
+// Names and categories must be string literals. Without {{ projectNameUpper }}_TRACING_ENABLED the macros compile to nothing.
+namespace {{ projectNameLower }} {
+namespace tracing {
+
+void writeChromeTrace(std::ostream& out);
+bool writeChromeTrace(const char* path);
+// Drops the events recorded so far
+void clear();
+
+}
+}
+
+#if defined({{ projectNameUpper }}_TRACING_ENABLED) && {{ projectNameUpper }}_TRACING_ENABLED
+
+#include <atomic>
+#include <chrono>
+
+#ifndef {{ projectNameUpper }}_TRACING_BUFFER_SIZE
+#define {{ projectNameUpper }}_TRACING_BUFFER_SIZE 4096
+#endif
+
+namespace {{ projectNameLower }} {
+namespace tracing {
+
+struct Event
+{
+    const char* name;
+    const char* category;
+    std::uint64_t beginNs;
+    std::uint64_t endNs;
+};
+
+// Only written by its own thread, when it is full the oldest events are overwritten. When the thread exits the buffer is
+// handed to the next thread that registers, so threads that don't run at the same time share a tid in the trace.
+struct ThreadBuffer
+{
+    static const std::size_t Capacity = {{ projectNameUpper }}_TRACING_BUFFER_SIZE;
+    static_assert((Capacity & (Capacity - 1)) == 0, "The tracing buffer size must be a power of two.");
+
+    explicit ThreadBuffer(std::uint32_t threadId) : threadId(threadId), head(0), tail(0) {}
+
+    void push(const char* name, const char* category, std::uint64_t beginNs, std::uint64_t endNs) noexcept
+    {
+        const std::uint64_t index = head.load(std::memory_order_relaxed);
+        Event& event = events[index & (Capacity - 1)];
+        event.name = name;
+        event.category = category;
+        event.beginNs = beginNs;
+        event.endNs = endNs;
+        head.store(index + 1, std::memory_order_release);
+    }
+
+    const std::uint32_t threadId;
+    std::atomic<std::uint64_t> head;
+    std::atomic<std::uint64_t> tail;
+    Event events[Capacity];
+};
+
+// Returns nullptr once the thread is exiting and its buffer was handed back, the scopes recorded then are dropped
+ThreadBuffer* registerThread();
+
+// Trivially destructible, so reading it doesn't need the guard of a thread_local with a destructor
+inline ThreadBuffer*& currentThreadBuffer() noexcept
+{
+    static thread_local ThreadBuffer* buffer = nullptr;
+    return buffer;
+}
+
+inline ThreadBuffer* threadBuffer()
+{
+    ThreadBuffer*& buffer = currentThreadBuffer();
+    if (buffer == nullptr)
+    {
+        buffer = registerThread();
+    }
+    return buffer;
+}
+
+inline std::uint64_t nowNs() noexcept
+{
+    return static_cast<std::uint64_t>(
+        std::chrono::duration_cast<std::chrono::nanoseconds>(std::chrono::steady_clock::now().time_since_epoch()).count());
+}
+
+class Scope
+{
+public:
+    Scope(const char* name, const char* category) noexcept : name(name), category(category), beginNs(nowNs()) {}
+    ~Scope()
+    {
+        if (ThreadBuffer* buffer = threadBuffer())
+        {
+            buffer->push(name, category, beginNs, nowNs());
+        }
+    }
+
+    Scope(const Scope&) = delete;
+    Scope& operator=(const Scope&) = delete;
+
+private:
+    const char* name;
+    const char* category;
+    std::uint64_t beginNs;
+};
+
+}
+}
+
+#define {{ projectNameUpper }}_TRACE_CONCAT_IMPL(a, b) a##b
+#define {{ projectNameUpper }}_TRACE_CONCAT(a, b) {{ projectNameUpper }}_TRACE_CONCAT_IMPL(a, b)
+#define {{ projectNameUpper }}_TRACE_ZONE(name, category) \\
+    ::{{ projectNameLower }}::tracing::Scope {{ projectNameUpper }}_TRACE_CONCAT({{ projectNameLower }}TraceScope, __LINE__)(name, category)
+#define {{ projectNameUpper }}_TRACE_SCOPE(name) {{ projectNameUpper }}_TRACE_ZONE(name, "{{ projectNameLower }}")
+#define {{ projectNameUpper }}_TRACE_FUNCTION() {{ projectNameUpper }}_TRACE_ZONE(__func__, "{{ projectNameLower }}")
+
+#else
+
+#define {{ projectNameUpper }}_TRACE_ZONE(name, category) static_cast<void>(0)
+#define {{ projectNameUpper }}_TRACE_SCOPE(name) static_cast<void>(0)
+#define {{ projectNameUpper }}_TRACE_FUNCTION() static_cast<void>(0)
+
+#endif
+
+#endif
+"""
+
+builtinTemplates["tracing/tracing.cpp"] = """\
+#include "{{ projectNameLower }}/tracing.h"
+
+#include <fstream>
+
+#if defined({{ projectNameUpper }}_TRACING_ENABLED) && {{ projectNameUpper }}_TRACING_ENABLED
+
+#include <cstdio>
+#include <memory>
+#include <mutex>
+#include <vector>
+
+namespace {{ projectNameLower }} {
+namespace tracing {
+
+namespace
+{
+
+struct Registry
+{
+    std::mutex mutex;
+    std::vector<std::unique_ptr<ThreadBuffer>> buffers;
+    // Buffers of the exited threads
+    std::vector<ThreadBuffer*> freeBuffers;
+};
+
+// Never destroyed, threads may still record events while the static objects are destroyed
+Registry& registry()
+{
+    static Registry* instance = new Registry();
+    return *instance;
+}
+
+void writeString(std::ostream& out, const char* value)
+{
+    out << '"';
+    for (const char* c = value; *c != '\\0'; ++c)
+    {
+        if (*c == '"' || *c == '\\\\')
+        {
+            out << '\\\\' << *c;
+        }
+        else if (static_cast<unsigned char>(*c) < 0x20)
+        {
+            out << ' ';
+        }
+        else
+        {
+            out << *c;
+        }
+    }
+    out << '"';
+}
+
+void writeMicroseconds(std::ostream& out, std::uint64_t ns)
+{
+    char buffer[32];
+    std::snprintf(buffer, sizeof(buffer), "%llu.%03llu", static_cast<unsigned long long>(ns / 1000), static_cast<unsigned long long>(ns % 1000));
+    out << buffer;
+}
+
+ThreadBuffer* acquireBuffer(Registry& instance)
+{
+    std::lock_guard<std::mutex> lock(instance.mutex);
+    if (!instance.freeBuffers.empty())
+    {
+        ThreadBuffer* buffer = instance.freeBuffers.back();
+        instance.freeBuffers.pop_back();
+        return buffer;
+    }
+    instance.buffers.emplace_back(new ThreadBuffer(static_cast<std::uint32_t>(instance.buffers.size() + 1)));
+    return instance.buffers.back().get();
+}
+
+// Set once the owner of the calling thread was destroyed
+thread_local bool threadExited = false;
+
+// Hands the buffer of its thread back to the registry when the thread exits
+struct ThreadBufferOwner
+{
+    ThreadBuffer* buffer = nullptr;
+
+    ~ThreadBufferOwner()
+    {
+        threadExited = true;
+        if (buffer != nullptr)
+        {
+            currentThreadBuffer() = nullptr;
+            Registry& instance = registry();
+            std::lock_guard<std::mutex> lock(instance.mutex);
+            instance.freeBuffers.push_back(buffer);
+        }
+    }
+};
+
+}
+
+ThreadBuffer* registerThread()
+{
+    // Scopes of thread_local destructors running after the owner would need a buffer that is never handed back
+    if (threadExited)
+    {
+        return nullptr;
+    }
+    static thread_local ThreadBufferOwner owner;
+    owner.buffer = acquireBuffer(registry());
+    return owner.buffer;
+}
+
+// The events are copied out of the ring buffers first, the ones their thread overwrote meanwhile are dropped
+void writeChromeTrace(std::ostream& out)
+{
+    Registry& instance = registry();
+    std::lock_guard<std::mutex> lock(instance.mutex);
+    std::vector<Event> events;
+    bool first = true;
+    out << "{\\"traceEvents\\":[";
+    for (const std::unique_ptr<ThreadBuffer>& buffer : instance.buffers)
+    {
+        const std::uint64_t head = buffer->head.load(std::memory_order_acquire);
+        std::uint64_t begin = head > ThreadBuffer::Capacity ? head - ThreadBuffer::Capacity : 0;
+        if (begin < buffer->tail.load(std::memory_order_relaxed))
+        {
+            begin = buffer->tail.load(std::memory_order_relaxed);
+        }
+        events.clear();
+        for (std::uint64_t index = begin; index < head; ++index)
+        {
+            events.push_back(buffer->events[index & (ThreadBuffer::Capacity - 1)]);
+        }
+        std::atomic_thread_fence(std::memory_order_acquire);
+        const std::uint64_t writing = buffer->head.load(std::memory_order_relaxed) + 1;
+        const std::uint64_t firstValid = writing > ThreadBuffer::Capacity ? writing - ThreadBuffer::Capacity : 0;
+
+        for (std::uint64_t index = begin; index < head; ++index)
+        {
+            if (index < firstValid)
+            {
+                continue;
+            }
+            const Event& event = events[index - begin];
+            out << (first ? "" : ",") << "{\\"name\\":";
+            writeString(out, event.name);
+            out << ",\\"cat\\":";
+            writeString(out, event.category);
+            out << ",\\"ph\\":\\"X\\",\\"ts\\":";
+            writeMicroseconds(out, event.beginNs);
+            out << ",\\"dur\\":";
+            writeMicroseconds(out, event.endNs - event.beginNs);
+            out << ",\\"pid\\":1,\\"tid\\":" << buffer->threadId << "}";
+            first = false;
+        }
+    }
+    out << "],\\"displayTimeUnit\\":\\"ns\\"}\\n";
+}
+
+void clear()
+{
+    Registry& instance = registry();
+    std::lock_guard<std::mutex> lock(instance.mutex);
+    for (const std::unique_ptr<ThreadBuffer>& buffer : instance.buffers)
+    {
+        buffer->tail.store(buffer->head.load(std::memory_order_acquire), std::memory_order_relaxed);
+    }
+}
+
+}
+}
+
+#else
+
+namespace {{ projectNameLower }} {
+namespace tracing {
+
+void writeChromeTrace(std::ostream& out)
+{
+    out << "{\\"traceEvents\\":[],\\"displayTimeUnit\\":\\"ns\\"}\\n";
+}
+
+void clear()
+{
+}
+
+}
+}
+
+#endif
+
+namespace {{ projectNameLower }} {
+namespace tracing {
+
+bool writeChromeTrace(const char* path)
+{
+    std::ofstream out(path);
+    writeChromeTrace(out);
+    return static_cast<bool>(out);
+}
+
+}
+}
+"""
+
+builtinTemplates["tracing/tracingTest.cpp"] = """\
+#include "{{ projectNameLower }}/tracing.h"
+
+#include "gtest/gtest.h"
+
+#include <chrono>
+#include <set>
+#include <sstream>
+#include <string>
+#include <thread>
+
+#ifndef {{ projectNameUpper }}_TRACING_OVERHEAD_LIMIT
+#define {{ projectNameUpper }}_TRACING_OVERHEAD_LIMIT 500
+#endif
+
+namespace
+{
+
+std::size_t countOccurrences(const std::string& text, const std::string& pattern)
+{
+    std::size_t count = 0;
+    for (std::size_t position = text.find(pattern); position != std::string::npos; position = text.find(pattern, position + 1))
+    {
+        ++count;
+    }
+    return count;
+}
+
+void tracedWork(int depth)
+{
+    {{ projectNameUpper }}_TRACE_SCOPE("tracedWork");
+    if (depth > 0)
+    {
+        tracedWork(depth - 1);
+    }
+}
+
+}
+
+TEST(TracingTest, WritesChromeTraceEvents)
+{
+    {{ projectNameLower }}::tracing::clear();
+    tracedWork(2);
+    std::thread worker([]() { {{ projectNameUpper }}_TRACE_ZONE("worker", "test"); });
+    worker.join();
+
+    std::ostringstream out;
+    {{ projectNameLower }}::tracing::writeChromeTrace(out);
+    const std::string trace = out.str();
+    EXPECT_EQ(0u, trace.find("{\\"traceEvents\\":["));
+    EXPECT_NE(std::string::npos, trace.find("],\\"displayTimeUnit\\":\\"ns\\"}"));
+#if defined({{ projectNameUpper }}_TRACING_ENABLED) && {{ projectNameUpper }}_TRACING_ENABLED
+    EXPECT_EQ(3u, countOccurrences(trace, "{\\"name\\":\\"tracedWork\\",\\"cat\\":\\"{{ projectNameLower }}\\",\\"ph\\":\\"X\\",\\"ts\\":"));
+    EXPECT_EQ(1u, countOccurrences(trace, "{\\"name\\":\\"worker\\",\\"cat\\":\\"test\\",\\"ph\\":\\"X\\",\\"ts\\":"));
+    EXPECT_EQ(4u, countOccurrences(trace, ",\\"dur\\":"));
+    EXPECT_EQ(4u, countOccurrences(trace, ",\\"pid\\":1,\\"tid\\":"));
+#else
+    EXPECT_EQ(std::string::npos, trace.find("\\"ph\\""));
+#endif
+}
+
+TEST(TracingTest, ReusesTheBuffersOfExitedThreads)
+{
+    {{ projectNameLower }}::tracing::clear();
+    for (int i = 0; i < 50; ++i)
+    {
+        std::thread worker([]() { {{ projectNameUpper }}_TRACE_ZONE("shortLived", "test"); });
+        worker.join();
+    }
+
+    std::ostringstream out;
+    {{ projectNameLower }}::tracing::writeChromeTrace(out);
+    const std::string trace = out.str();
+#if defined({{ projectNameUpper }}_TRACING_ENABLED) && {{ projectNameUpper }}_TRACING_ENABLED
+    const std::string event = "{\\"name\\":\\"shortLived\\"";
+    std::set<std::string> threadIds;
+    for (std::size_t position = trace.find(event); position != std::string::npos; position = trace.find(event, position + 1))
+    {
+        const std::size_t tid = trace.find("\\"tid\\":", position) + 6;
+        threadIds.insert(trace.substr(tid, trace.find('}', tid) - tid));
+    }
+    EXPECT_EQ(50u, countOccurrences(trace, event));
+    EXPECT_EQ(1u, threadIds.size());
+#else
+    EXPECT_EQ(std::string::npos, trace.find("shortLived"));
+#endif
+}
+
+TEST(TracingTest, ScopeOverhead)
+{
+    {{ projectNameLower }}::tracing::clear();
+    const int iterations = 1000000;
+    const auto begin = std::chrono::steady_clock::now();
+    for (int i = 0; i < iterations; ++i)
+    {
+        {{ projectNameUpper }}_TRACE_SCOPE("overhead");
+    }
+    const double nsPerScope = std::chrono::duration<double, std::nano>(std::chrono::steady_clock::now() - begin).count() / iterations;
+    RecordProperty("nsPerScope", static_cast<int>(nsPerScope));
+    // Two clock reads and a store into the ring buffer, the wall clock based limit is set by {{ projectNameUpper }}_TRACING_OVERHEAD_LIMIT
+    const double limit = {{ projectNameUpper }}_TRACING_OVERHEAD_LIMIT;
+    if (limit > 0)
+    {
+        EXPECT_LT(nsPerScope, limit);
+    }
+}
+"""
+
+builtinTemplates["header.h"] = """\
+#ifndef {{ projectNameUpper }}_H
+#define {{ projectNameUpper }}_H
+
+#endif
+
+"""
+
+builtinTemplates["source.cpp"] = """\
+#include "{{ projectNameLower }}/{{ projectNameLower }}.h"
+"""
+
+builtinTemplates["synthetic/header.h"] = """\
+#ifndef {{ header.guard }}
+#define {{ header.guard }}
+
+{% for include in header.includes %}
+#include "{{ include.path }}"
+{% endfor %}
+
+namespace synthetic_{{ projectNameLower }} {
+namespace {{ header.module }} {
+
+template <int N> struct {{ header.typeName }} {
+    static const unsigned long value = {{ header.typeName }}<N - 1>::value * 31u + N;
+};
+
+template <> struct {{ header.typeName }}<0> {
+    static const unsigned long value = {{ header.salt }}u;
+};
+
+inline unsigned long {{ header.functionName }}() {
+    return {{ header.typeName }}<{{ templateDepth }}>::value
+{% for include in header.includes %}
+        + {{ include.function }}()
+{% endfor %}
+        ;
+}
+
+}
+}
+
+#endif
+"""
+
+builtinTemplates["synthetic/source.cpp"] = """\
+{% for include in source.includes %}
+#include "{{ include.path }}"
+{% endfor %}
+
+namespace synthetic_{{ projectNameLower }} {
+namespace {{ source.module }} {
+
+unsigned long {{ source.functionName }}() {
+    return 0u
+{% for include in source.includes %}
+        + {{ include.function }}()
+{% endfor %}
+        ;
+}
+
+}
+}
+"""
+
+builtinTemplates["build.sh"] = """\
+#!/bin/bash
+
+usage() {
+{% if withBenchmarks %}
+    echo "Usage: build.sh [-j jobs] [-l load average] [-t] [-b] [-r threshold] [test|bench{% if pgo %}|pgo{% endif %}]";
+{% else %}
+    echo "Usage: build.sh [-j jobs] [-l load average] [-t] [test{% if pgo %}|pgo{% endif %}]";
+{% endif %}
+{% if testSubdirectory %}
+    echo "    -j  Maximum number of parallel jobs. Default is BUILD_JOBS or the cpu count.";
+{% else %}
+    echo "    -j  Maximum number of parallel jobs, split between the main and the test build. Default is BUILD_JOBS or the cpu count.";
+{% endif %}
+    echo "    -l  Don't start new jobs above the given load average. Default is BUILD_LOAD_AVERAGE.";
+    echo "    -t  Compile with -ftime-trace(clang only) and add the slowest headers and templates to the timing report.";
+{% if withBenchmarks %}
+    echo "    -b  bench: store the benchmark results as the new baseline instead of comparing against it.";
+    echo "    -r  bench: fail when a benchmark is slower than the baseline by more than the given percent. Default is BENCHMARK_THRESHOLD or {{ benchmarkThreshold }}.";
+{% endif %}
+{% if pgo %}
+    echo "    pgo: instrumented build, training run(PGO_TRAINING_COMMAND overrides the generated one), optimized build and install.";
+{% endif %}
+}
+
+echo "Building: {{ projectName }}";
+PROJECT_PATH="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+. ${PROJECT_PATH}/../baseEnvironment.sh;
+
+jobs="${BUILD_JOBS:-`nproc 2> /dev/null || echo 2`}";
+loadAverage="${BUILD_LOAD_AVERAGE:-}";
+timeTrace="OFF";
+{% if withBenchmarks %}
+updateBaseline="OFF";
+benchmarkThreshold="${BENCHMARK_THRESHOLD:-{{ benchmarkThreshold }}}";
+{% endif %}
+while getopts "j:l:t{% if withBenchmarks %}br:{% endif %}h" option; do
+    case "${option}" in
+        j) jobs="${OPTARG}";;
+        l) loadAverage="${OPTARG}";;
+        t) timeTrace="ON";;
+{% if withBenchmarks %}
+        b) updateBaseline="ON";;
+        r) benchmarkThreshold="${OPTARG}";;
+{% endif %}
+        *) usage; exit 1;;
+    esac
+done
+shift $((OPTIND - 1));
+
+BUILD_PATH="{{ buildPath }}";
+TEST_BUILD_PATH="${BUILD_PATH}/test";
+TIMING_REPORT="${BUILD_PATH}/buildTimings.json";
+mkdir -p "${BUILD_PATH}";
+
+nowMs() {
+    echo $((`date +%s%N` / 1000000));
+}
+buildStartMs="`nowMs`";
+
+CMAKE_ARGS=(-DCMAKE_INSTALL_PREFIX:PATH="${INSTALL_PREFIX}" -DBUILD_SHARED_LIBS:BOOL=ON -D{{ projectNameUpper }}_TIME_TRACE:BOOL=${timeTrace} -G Ninja);
+NINJA_ARGS=();
+if [ -n "${loadAverage}" ]; then NINJA_ARGS+=(-l "${loadAverage}"); fi
+# Cache entries that only have to be set in the tree, they are compared with its cache instead of being part of the configure hash
+CACHE_ARGS=();
+# Targets built besides the default ones, e.g. the tests that are excluded from all
+NINJA_TARGETS=();
+# Arguments only passed when a configure runs anyway, e.g. values derived from the current state of the machine
+CONFIGURE_ARGS=();
+{% if jobPools %}
+
+# Compile jobs are limited by the cores, link jobs by the available memory, BUILD_COMPILE_JOBS and BUILD_LINK_JOBS override them
+memAvailableMb=$((`awk '/^MemAvailable:/ { print $2 }' /proc/meminfo 2> /dev/null || echo 0` / 1024));
+if [ "${memAvailableMb}" -le "0" ]; then memAvailableMb=$((jobs * {{ linkJobMemory }})); fi
+compileJobs="${BUILD_COMPILE_JOBS:-$((memAvailableMb / {{ compileJobMemory }}))}";
+if [ "${compileJobs}" -gt "${jobs}" ]; then compileJobs="${jobs}"; fi
+linkJobs="${BUILD_LINK_JOBS:-$((memAvailableMb / {{ linkJobMemory }}))}";
+{% if not testSubdirectory %}
+# The main and the test tree may link at the same time, the trees share the same limit so it doesn't depend on the command
+if [ -z "${BUILD_LINK_JOBS}" ]; then linkJobs=$((linkJobs / 2)); fi
+{% endif %}
+if [ "${compileJobs}" -lt "1" ]; then compileJobs=1; fi
+if [ "${linkJobs}" -lt "1" ]; then linkJobs=1; fi
+if [ "${linkJobs}" -gt "${compileJobs}" ]; then linkJobs="${compileJobs}"; fi
+# The limits derived from the available memory are only applied when configuring, so the fluctuation of the memory doesn't
+# reconfigure the trees, BUILD_COMPILE_JOBS and BUILD_LINK_JOBS reconfigure them when they differ from the cache.
+if [ -n "${BUILD_COMPILE_JOBS}" ]; then
+    CACHE_ARGS+=({{ projectNameUpper }}_COMPILE_JOBS:STRING=${compileJobs});
+else
+    CONFIGURE_ARGS+=(-D{{ projectNameUpper }}_COMPILE_JOBS:STRING=${compileJobs});
+fi
+if [ -n "${BUILD_LINK_JOBS}" ]; then
+    CACHE_ARGS+=({{ projectNameUpper }}_LINK_JOBS:STRING=${linkJobs});
+else
+    CONFIGURE_ARGS+=(-D{{ projectNameUpper }}_LINK_JOBS:STRING=${linkJobs});
+fi
+echo "Job pools: ${compileJobs} compile, ${linkJobs} link jobs(${memAvailableMb} MB available)";
+{% endif %}
+{% if testSubdirectory %}
+# Once enabled the test target stays configured, the other commands just don't build it
+if [ "$1" == "test" ]; then
+    CACHE_ARGS+=({{ projectNameUpper }}_BUILD_TESTS:BOOL=ON);
+    NINJA_TARGETS+=(all {{ projectName }}_test);
+fi
+{% endif %}
+{% if withBenchmarks %}
+if [ "$1" == "bench" ]; then
+    CACHE_ARGS+=({{ projectNameUpper }}_BUILD_BENCHMARKS:BOOL=ON);
+    NINJA_TARGETS+=(all {{ projectName }}_benchmark);
+fi
+{% endif %}
+
+# Any change of the CMake files or of the configure arguments requires a new configure
+configureHash="`{ echo "${CMAKE_ARGS[@]}"; find "${PROJECT_PATH}" \\( -name CMakeLists.txt -o -name "*.cmake" \\) -not -path "*/.git/*" -print0 | sort -z | xargs -0 cat; } | md5sum | cut -d " " -f 1`";
+
+# Configures(when needed) and builds one tree, the results and durations(ms) are written into its .buildStatus file.
+buildTree() {
+    local buildDir="$1";
+    local sourceDir="$2";
+    local treeJobs="$3";
+    local configStatus="skipped";
+    local buildStatus="skipped";
+    local configMs=0;
+    local buildMs=0;
+    local startMs="`nowMs`";
+
+    mkdir -p "${buildDir}";
+    local configure="OFF";
+    if [ ! -f "${buildDir}/CMakeCache.txt" ] || [ ! -f "${buildDir}/build.ninja" ] || [ "`cat "${buildDir}/.configureHash" 2> /dev/null`" != "${configureHash}" ]; then
+        configure="ON";
+    fi
+    for cacheArg in "${CACHE_ARGS[@]}"; do
+        if ! grep -qxF "${cacheArg}" "${buildDir}/CMakeCache.txt" 2> /dev/null; then configure="ON"; fi
+    done
+    if [ "${configure}" == "ON" ]; then
+        rm -f "${buildDir}/.configureHash";
+        (cd "${buildDir}" && cmake "${CMAKE_ARGS[@]}" "${CACHE_ARGS[@]/#/-D}" "${CONFIGURE_ARGS[@]}" "${sourceDir}");
+        configStatus=$?;
+        if [ "${configStatus}" -eq "0" ]; then echo "${configureHash}" > "${buildDir}/.configureHash"; fi
+    fi
+    configMs=$((`nowMs` - startMs));
+
+    if [ "${configStatus}" == "0" ] || [ "${configStatus}" == "skipped" ]; then
+        startMs="`nowMs`";
+        ninja -C "${buildDir}" -j "${treeJobs}" "${NINJA_ARGS[@]}" "${NINJA_TARGETS[@]}";
+        buildStatus=$?;
+        buildMs=$((`nowMs` - startMs));
+    fi
+    echo "${configStatus} ${buildStatus} ${configMs} ${buildMs}" > "${buildDir}/.buildStatus";
+}
+
+# Installs one tree when its build succeeded, the result and duration(ms) are written into its .installStatus file.
+installTree() {
+    local buildDir="$1";
+    local installStatus="skipped";
+    local startMs="`nowMs`";
+
+    if [ "$2" == "0" ]; then
+        ninja -C "${buildDir}" install;
+        installStatus=$?;
+    fi
+    echo "${installStatus} $((`nowMs` - startMs))" > "${buildDir}/.installStatus";
+}
+
+{% if pgo %}
+PGO_REPORT_ARGS=();
+if [ "$1" == "pgo" ]; then
+    # Instrumented build and training run in their own build directory, the optimized build below uses the profiles
+    PGO_PROFILE_DIR="${BUILD_PATH}/pgo/profiles";
+    PGO_GENERATE_PATH="${BUILD_PATH}/pgo/generate";
+    pgoTraining="${PGO_TRAINING_COMMAND:-}";
+    if [ -z "${pgoTraining}" ]; then pgoTraining={{ pgoTrainingCommand }}; fi
+    rm -rf "${PGO_PROFILE_DIR}";
+    mkdir -p "${PGO_PROFILE_DIR}";
+
+    baseCMakeArgs=("${CMAKE_ARGS[@]}");
+    baseNinjaTargets=("${NINJA_TARGETS[@]}");
+    baseConfigureHash="${configureHash}";
+    CMAKE_ARGS+=(-D{{ projectNameUpper }}_PGO_STAGE:STRING=generate -D{{ projectNameUpper }}_PGO_PROFILE_DIR:PATH="${PGO_PROFILE_DIR}");
+    NINJA_TARGETS=(all);
+{% if withBenchmarks %}
+    CMAKE_ARGS+=(-D{{ projectNameUpper }}_BUILD_BENCHMARKS:BOOL=ON);
+    NINJA_TARGETS+=({{ projectName }}_benchmark);
+{% endif %}
+{% if testSubdirectory %}
+    CMAKE_ARGS+=(-D{{ projectNameUpper }}_BUILD_TESTS:BOOL=ON);
+    NINJA_TARGETS+=({{ projectName }}_test);
+{% endif %}
+    configureHash="${baseConfigureHash}-pgoGenerate";
+{% if pgoNestedTests %}
+    # The tests are the training, their tree builds its own instrumented copy of the project
+    buildTree "${PGO_GENERATE_PATH}" "${PROJECT_PATH}/code/test" "${jobs}";
+{% else %}
+    buildTree "${PGO_GENERATE_PATH}" "${PROJECT_PATH}" "${jobs}";
+{% endif %}
+    NINJA_TARGETS=("${baseNinjaTargets[@]}");
+    read pgoConfigOk pgoBuildOk pgoConfigMs pgoBuildMs < "${PGO_GENERATE_PATH}/.buildStatus";
+    PGO_REPORT_ARGS+=(--phase "pgoConfigure:${pgoConfigOk}:${pgoConfigMs}" --phase "pgoBuild:${pgoBuildOk}:${pgoBuildMs}");
+    if [ "${pgoBuildOk}" != "0" ]; then
+        echo "==== Instrumented build of {{ projectName }} FAILED!";
+        exit 1;
+    fi
+
+    trainingStartMs="`nowMs`";
+    echo "==== Training run: ${pgoTraining}";
+    (cd "${PGO_GENERATE_PATH}" && eval "${pgoTraining}");
+    trainingOk=$?;
+    # clang writes raw profiles that have to be merged, gcc updates its profiles in place
+    if [ "${trainingOk}" == "0" ] && ls "${PGO_PROFILE_DIR}"/*.profraw &> /dev/null; then
+        profdata="`command -v llvm-profdata || ls /usr/bin/llvm-profdata-* 2> /dev/null | sort -V | tail -n 1`";
+        if [ -z "${profdata}" ]; then
+            echo "==== llvm-profdata is needed to merge the training profiles!";
+            trainingOk=1;
+        else
+            "${profdata}" merge -output="${PGO_PROFILE_DIR}/merged.profdata" "${PGO_PROFILE_DIR}"/*.profraw;
+            trainingOk=$?;
+        fi
+    fi
+{% if pgoNestedTests %}
+    # gcc names its profiles after the object paths, in the test tree they contain the project path that the use stage doesn't have
+    mangledProjectPath="${PROJECT_PATH//\\//#}#";
+    for profile in "${PGO_PROFILE_DIR}"/*.gcda; do
+        profileName="`basename "${profile}"`";
+        if [ -f "${profile}" ] && [ "${profileName/"${mangledProjectPath}"/#}" != "${profileName}" ]; then
+            mv -f "${profile}" "${PGO_PROFILE_DIR}/${profileName/"${mangledProjectPath}"/#}";
+        fi
+    done
+{% endif %}
+    PGO_REPORT_ARGS+=(--phase "pgoTraining:${trainingOk}:$((`nowMs` - trainingStartMs))");
+    if [ "${trainingOk}" != "0" ]; then
+        echo "==== PGO training of {{ projectName }} FAILED!";
+        exit 1;
+    fi
+
+    # The optimized build and its install continue in the use stage directory
+    CMAKE_ARGS=("${baseCMakeArgs[@]}" -D{{ projectNameUpper }}_PGO_STAGE:STRING=use -D{{ projectNameUpper }}_PGO_PROFILE_DIR:PATH="${PGO_PROFILE_DIR}");
+    configureHash="${baseConfigureHash}-pgoUse";
+    BUILD_PATH="${BUILD_PATH}/pgo/use";
+fi
+
+{% endif %}
+{% if testSubdirectory %}
+buildTree "${BUILD_PATH}" "${PROJECT_PATH}" "${jobs}";
+{% else %}
+if [ "$1" == "test" ]; then
+    # The test tree builds its own copy of the project, so both builds can run at the same time
+    testJobs=$((jobs / 2));
+    if [ "${testJobs}" -lt "1" ]; then testJobs=1; fi
+    mainJobs=$((jobs - testJobs));
+    if [ "${mainJobs}" -lt "1" ]; then mainJobs=1; fi
+    buildTree "${BUILD_PATH}" "${PROJECT_PATH}" "${mainJobs}" 2>&1 | sed -u "s/^/[main] /" &
+    buildTree "${TEST_BUILD_PATH}" "${PROJECT_PATH}/code/test" "${testJobs}" 2>&1 | sed -u "s/^/[test] /" &
+    wait;
+else
+    buildTree "${BUILD_PATH}" "${PROJECT_PATH}" "${jobs}";
+fi
+{% endif %}
+
+read configOk buildOk configMs buildMs < "${BUILD_PATH}/.buildStatus";
+installTree "${BUILD_PATH}" "${buildOk}";
+read installOk installMs < "${BUILD_PATH}/.installStatus";
+REPORT_ARGS=(--phase "configure:${configOk}:${configMs}" --phase "build:${buildOk}:${buildMs}" --phase "install:${installOk}:${installMs}" \\
+             --ninjaLog "main:${BUILD_PATH}/.ninja_log");
+{% if pgo %}
+REPORT_ARGS+=("${PGO_REPORT_ARGS[@]}");
+{% endif %}
+
+failed=0;
+for status in "${configOk}" "${buildOk}" "${installOk}"; do
+    if [ "${status}" != "0" ] && [ "${status}" != "skipped" ]; then failed=1; fi
+done
+
+if [ "$1" == "test" ]; then
+{% if testSubdirectory %}
+    # The tests were built with the main tree, ctest runs them in parallel
+    testOk="skipped";
+    testStartMs="`nowMs`";
+    if [ "${buildOk}" == "0" ]; then
+        ctestJobs="${CTEST_PARALLEL_LEVEL:-{{ ctestParallel }}}";
+        (cd "${BUILD_PATH}" && ctest -j "${ctestJobs:-${jobs}}" --output-on-failure);
+        testOk=$?;
+    fi
+    REPORT_ARGS+=(--phase "test:${testOk}:$((`nowMs` - testStartMs))");
+    if [ "${testOk}" != "0" ] && [ "${testOk}" != "skipped" ]; then failed=1; fi
+{% else %}
+    read testConfigOk testBuildOk testConfigMs testBuildMs < "${TEST_BUILD_PATH}/.buildStatus";
+    installTree "${TEST_BUILD_PATH}" "`if [ "${installOk}" == "0" ]; then echo "${testBuildOk}"; fi`";
+    read testInstallOk testInstallMs < "${TEST_BUILD_PATH}/.installStatus";
+    REPORT_ARGS+=(--phase "testConfigure:${testConfigOk}:${testConfigMs}" --phase "testBuild:${testBuildOk}:${testBuildMs}" \\
+                  --phase "testInstall:${testInstallOk}:${testInstallMs}" --ninjaLog "test:${TEST_BUILD_PATH}/.ninja_log");
+    for status in "${testConfigOk}" "${testBuildOk}" "${testInstallOk}"; do
+        if [ "${status}" != "0" ] && [ "${status}" != "skipped" ]; then failed=1; fi
+    done
+{% endif %}
+fi
+{% if withBenchmarks %}
+
+if [ "$1" == "bench" ]; then
+    # The benchmarks were built with the main tree, their JSON results are compared against the stored baseline
+    benchOk="skipped";
+    benchStartMs="`nowMs`";
+    BENCHMARK_RESULTS="${BUILD_PATH}/benchmarkResults.json";
+    BENCHMARK_BASELINE="${BENCHMARK_BASELINE:-${PROJECT_PATH}/code/benchmark/baseline.json}";
+    if [ "${buildOk}" == "0" ]; then
+        "${BUILD_PATH}/benchmark/{{ projectName }}_benchmark" --benchmark_out="${BENCHMARK_RESULTS}" --benchmark_out_format=json;
+        benchOk=$?;
+        if [ "${benchOk}" != "0" ]; then
+            :
+        elif [ "${updateBaseline}" == "ON" ]; then
+            cp "${BENCHMARK_RESULTS}" "${BENCHMARK_BASELINE}";
+            echo "==== Stored the benchmark baseline: ${BENCHMARK_BASELINE}";
+        elif [ -f "${BENCHMARK_BASELINE}" ]; then
+            python3 "${PROJECT_PATH}/resources/scripts/compareBenchmarks.py" "${BENCHMARK_BASELINE}" "${BENCHMARK_RESULTS}" --threshold "${benchmarkThreshold}";
+            benchOk=$?;
+        else
+            echo "==== No benchmark baseline yet, store one with: build.sh -b bench";
+        fi
+    fi
+    REPORT_ARGS+=(--phase "benchmark:${benchOk}:$((`nowMs` - benchStartMs))");
+    if [ "${benchOk}" != "0" ] && [ "${benchOk}" != "skipped" ]; then failed=1; fi
+fi
+{% endif %}
+
+if [ "${timeTrace}" == "ON" ]; then
+    REPORT_ARGS+=(--timeTraceDir "${BUILD_PATH}");
+{% if not testSubdirectory %}
+    if [ "$1" == "test" ]; then REPORT_ARGS+=(--timeTraceDir "${TEST_BUILD_PATH}"); fi
+{% endif %}
+fi
+REPORT_ARGS+=(--totalMs $((`nowMs` - buildStartMs)));
+if command -v python3 &> /dev/null; then
+    python3 "${PROJECT_PATH}/resources/scripts/buildTimingReport.py" --project "{{ projectName }}" --output "${TIMING_REPORT}" "${REPORT_ARGS[@]}";
+else
+    echo "{\\"project\\": \\"{{ projectName }}\\", \\"totalSeconds\\": $(((`nowMs` - buildStartMs) / 1000))}" > "${TIMING_REPORT}";
+fi
+
+echo "==== Build {{ projectName }} finished, config: ${configOk}, build: ${buildOk}, install: ${installOk}!";
+if [ "$1" == "test" ]; then
+{% if testSubdirectory %}
+    echo "==== Tests finished: ${testOk}!";
+{% else %}
+    echo "==== Build Tests finished, config: ${testConfigOk}, build: ${testBuildOk}, install: ${testInstallOk}!";
+{% endif %}
+fi
+{% if withBenchmarks %}
+if [ "$1" == "bench" ]; then
+    echo "==== Benchmarks finished: ${benchOk}!";
+fi
+{% endif %}
+echo "==== Timing report: ${TIMING_REPORT}";
+if [ "${failed}" -ne "0" ]; then
+    echo "==== Build {{ projectName }} FAILED!";
+fi
+exit ${failed};
+"""
+
+builtinTemplates["scripts/buildTimingReport.py"] = r'''#!/usr/bin/python3
+
+import os
+import sys
+import json
+import argparse
+import datetime
+
+# Clang -ftime-trace events that are aggregated into the report
+headerEvents = ["Source"]
+templateEvents = ["InstantiateClass", "InstantiateFunction", "ParseTemplate"]
+
+
+def parseNinjaLog(path):
+    entries = {}
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                if line.startswith("#"):
+                    continue
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) >= 4:
+                    entries[fields[3]] = (int(fields[1]) - int(fields[0])) / 1000.0
+    except OSError:
+        pass
+    return entries
+
+
+def slowestTranslationUnits(ninjaLogs, top):
+    units = []
+    for treeName, path in ninjaLogs:
+        for output, seconds in parseNinjaLog(path).items():
+            if output.endswith(".o") or output.endswith(".obj"):
+                units.append({ "tree" : treeName, "output" : output, "seconds" : seconds })
+    units.sort(key=lambda unit: unit["seconds"], reverse=True)
+    return units[:top]
+
+
+# Only the given build trees are searched, the build trees nested in them(e.g. the pgo stages) belong to other builds
+def findTimeTraces(timeTraceDirs):
+    for timeTraceDir in timeTraceDirs:
+        for root, dirs, files in os.walk(timeTraceDir):
+            dirs[:] = [name for name in dirs if not os.path.isfile(os.path.join(root, name, "CMakeCache.txt"))]
+            for name in files:
+                if name.endswith(".json"):
+                    yield os.path.join(root, name)
+
+
+def aggregateTimeTraces(timeTraceDirs, top):
+    totals = { "headers" : {}, "templates" : {} }
+    traceCount = 0
+    for path in findTimeTraces(timeTraceDirs):
+        try:
+            with open(path, "r") as f:
+                trace = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not isinstance(trace, dict) or "traceEvents" not in trace:
+            continue
+        traceCount += 1
+        events = trace["traceEvents"]
+        for event in events:
+            if "dur" not in event:
+                continue
+            if event.get("name") in headerEvents:
+                category = "headers"
+            elif event.get("name") in templateEvents:
+                category = "templates"
+            else:
+                continue
+            detail = event.get("args", {}).get("detail", "")
+            entry = totals[category].setdefault(detail, { "name" : detail, "seconds" : 0.0, "count" : 0 })
+            entry["seconds"] += event["dur"] / 1000000.0
+            entry["count"] += 1
+
+    summary = { "traceFiles" : traceCount }
+    for category, entries in totals.items():
+        summary[category] = sorted(entries.values(), key=lambda entry: entry["seconds"], reverse=True)[:top]
+    return summary
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description="Writes the timing report of a build as JSON.")
+    argParser.add_argument("--project", required=True, help="Name of the built project.")
+    argParser.add_argument("--output", required=True, help="Path of the JSON report.")
+    argParser.add_argument("--phase", action="append", default=[], help="name:status:milliseconds of a build phase.")
+    argParser.add_argument("--ninjaLog", action="append", default=[], help="tree:path of a .ninja_log file.")
+    argParser.add_argument("--timeTraceDir", action="append", default=[], help="Build tree searched for clang -ftime-trace files, can be repeated.")
+    argParser.add_argument("--totalMs", type=int, default=0, help="Wall time of the whole build.")
+    argParser.add_argument("--top", type=int, default=20, help="Number of entries in the top lists. Default is 20.")
+    args = argParser.parse_args()
+
+    phases = {}
+    for phase in args.phase:
+        name, status, milliseconds = phase.split(":", 2)
+        phases[name] = { "status" : status, "seconds" : int(milliseconds) / 1000.0 }
+
+    report = { "project" : args.project, "finished" : datetime.datetime.now().isoformat(), \
+               "totalSeconds" : args.totalMs / 1000.0, "phases" : phases, \
+               "slowestTranslationUnits" : slowestTranslationUnits([log.split(":", 1) for log in args.ninjaLog], args.top) }
+    if args.timeTraceDir:
+        report["timeTrace"] = aggregateTimeTraces(args.timeTraceDir, args.top)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+        f.write("\n")
+'''
+
+builtinTemplates["workspace/CMakeLists.txt"] = """\
+# Superbuild of every project of the workspace, independent projects are built concurrently and each project is
+# installed into the shared sysroot once, after the projects it depends on.
+cmake_minimum_required(VERSION 3.10)
+project(Workspace NONE)
+include(ExternalProject)
+
+set(WORKSPACE_PROJECTS_BUILD_ROOT "${CMAKE_BINARY_DIR}/projects" CACHE PATH "Directory in which the projects are built.")
+set(WORKSPACE_CMAKE_ARGS
+    -DCMAKE_INSTALL_PREFIX:PATH=${CMAKE_INSTALL_PREFIX}
+    -DCMAKE_PREFIX_PATH:PATH=${CMAKE_INSTALL_PREFIX}
+    -DCMAKE_BUILD_TYPE:STRING=${CMAKE_BUILD_TYPE}
+    -DBUILD_SHARED_LIBS:BOOL=ON)
+
+{% for project in projects %}
+ExternalProject_Add({{ project.name }}
+    SOURCE_DIR "{{ project.sourceDir }}"
+    BINARY_DIR "${WORKSPACE_PROJECTS_BUILD_ROOT}/{{ project.name }}"
+    CMAKE_ARGS ${WORKSPACE_CMAKE_ARGS}
+{% if project.dependencies %}
+    DEPENDS {{ project.dependencies }}
+{% endif %}
+    BUILD_ALWAYS ON)
+{% endfor %}
+"""
+
+builtinTemplates["workspace/workspace.sh"] = r"""#!/bin/bash
+# Builds the projects of the workspace in dependency order, only the given projects and their dependencies when
+# there are any. Usage: workspace.sh [-j JOBS] [PROJECT...]
+WORKSPACE_PATH="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )";
+export PROJECT_ROOT="${PROJECT_ROOT:-${WORKSPACE_PATH}/{{ workspaceRoot }}/}";
+export BUILD_ROOT="${BUILD_ROOT:-${PROJECT_ROOT}/build/}";
+export INSTALL_PREFIX="${INSTALL_PREFIX:-${PROJECT_ROOT}/sysroot/}";
+
+jobs="${BUILD_JOBS:-`nproc`}";
+while getopts "j:" option; do
+    case "${option}" in
+        j) jobs="${OPTARG}";;
+        *) echo "Usage: $0 [-j JOBS] [PROJECT...]"; exit 1;;
+    esac
+done
+shift $((OPTIND - 1));
+
+WORKSPACE_BUILD_PATH="${BUILD_ROOT}/workspace";
+mkdir -p "${WORKSPACE_BUILD_PATH}";
+mkdir -p "${INSTALL_PREFIX}";
+
+# The nested project builds run through make as well, so they share the job slots of the top level make
+(cd "${WORKSPACE_BUILD_PATH}" && cmake -G "Unix Makefiles" -DCMAKE_INSTALL_PREFIX:PATH="${INSTALL_PREFIX}" "${WORKSPACE_PATH}") || exit $?;
+make -C "${WORKSPACE_BUILD_PATH}" -j "${jobs}" "$@";
+"""
+
+builtinTemplates["scripts/compareBenchmarks.py"] = r'''#!/usr/bin/python3
+
+import sys
+import json
+import argparse
+
+timeUnitScale = { "ns" : 1.0, "us" : 1e3, "ms" : 1e6, "s" : 1e9 }
+
+
+# Returns the time of every benchmark in nanoseconds, the mean is used when the benchmarks were repeated
+def loadBenchmarks(path, metric):
+    with open(path, "r") as f:
+        report = json.load(f)
+    times = {}
+    means = set()
+    for benchmark in report.get("benchmarks", []):
+        name = benchmark.get("run_name", benchmark["name"])
+        if benchmark.get("run_type") == "aggregate":
+            if benchmark.get("aggregate_name") != "mean":
+                continue
+            means.add(name)
+        elif name in means:
+            continue
+        times[name] = benchmark[metric] * timeUnitScale[benchmark.get("time_unit", "ns")]
+    return times
+
+
+def formatTime(nanoseconds):
+    for unit in ["s", "ms", "us"]:
+        if nanoseconds >= timeUnitScale[unit]:
+            return "{:.3f} {}".format(nanoseconds / timeUnitScale[unit], unit)
+    return "{:.3f} ns".format(nanoseconds)
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description="Compares Google Benchmark JSON results against a baseline.")
+    argParser.add_argument("baseline", help="JSON results of the baseline run.")
+    argParser.add_argument("results", help="JSON results of the current run.")
+    argParser.add_argument("--threshold", type=float, default={{ benchmarkThreshold }}, help="Allowed slowdown in percent.")
+    argParser.add_argument("--metric", choices=["real_time", "cpu_time"], default="real_time", help="Compared time of the benchmarks.")
+    args = argParser.parse_args()
+
+    baseline = loadBenchmarks(args.baseline, args.metric)
+    results = loadBenchmarks(args.results, args.metric)
+    regressions = []
+    print("{:<48} {:>14} {:>14} {:>9}".format("Benchmark", "baseline", "current", "change"))
+    for name, time in results.items():
+        if name not in baseline:
+            print("{:<48} {:>14} {:>14} {:>9}".format(name, "-", formatTime(time), "new"))
+            continue
+        change = (time - baseline[name]) / baseline[name] * 100.0 if baseline[name] > 0 else 0.0
+        regressed = change > args.threshold
+        if regressed:
+            regressions.append(name)
+        print("{:<48} {:>14} {:>14} {:>+8.1f}%{}".format(name, formatTime(baseline[name]), formatTime(time), change, " REGRESSION" if regressed else ""))
+    for name in baseline:
+        if name not in results:
+            print("{:<48} {:>14} {:>14} {:>9}".format(name, formatTime(baseline[name]), "-", "missing"))
+
+    if regressions:
+        print("{} benchmarks are more than {}% slower than the baseline: {}".format(len(regressions), args.threshold, ", ".join(regressions)))
+        sys.exit(1)
+'''
+
+builtinTemplates["scripts/defaultBaseEnvironment.sh"] = """\
+#!/bin/bash
+
+export BASE_ENVIRONMENT_SCRIPT_PATH="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )";
+export BUILD_ROOT="${BASE_ENVIRONMENT_SCRIPT_PATH}/../../../build/";
+export INSTALL_PREFIX="${BASE_ENVIRONMENT_SCRIPT_PATH}/../../../sysroot/";
+export PROJECT_ROOT="${BASE_ENVIRONMENT_SCRIPT_PATH}/../../../";
+"""
+
+builtinTemplates["scripts/defaultInitProject.sh"] = r"""#!/bin/bash
+SCRIPT_PATH="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )";
+. "${SCRIPT_PATH}/defaultBaseEnvironment.sh";
+mkdir -p "${BUILD_ROOT}";
+mkdir -p "${INSTALL_PREFIX}";
+{% if not gitInitialCommit %}
+{% if linkSharedResources %}
+ln -f "{{ configResPath }}/.clang-format"  "{{ projectPath }}";
+ln -f "{{ configResPath }}/.gitignore"  "{{ projectPath }}";
+ln -f "{{ configResPath }}/.gitmessage"  "{{ projectPath }}";
+{% else %}
+cp "{{ configResPath }}/.clang-format"  "{{ projectPath }}";
+cp "{{ configResPath }}/.gitignore"  "{{ projectPath }}";
+cp "{{ configResPath }}/.gitmessage"  "{{ projectPath }}";
+{% endif %}
+
+pushd "{{ projectPath }}" &> /dev/null;
+mkdir -p .git/hooks;
+printf '[user]\n\tname = %s\n\temail = %s\n' "{{ gitAuthorName }}" "{{ gitAuthorEmail }}" > ./.git/config 
+printf "[commit]\n\ttemplate = \"{{ projectPath }}/.gitmessage\"\n" >> ./.git/config 
+printf "[diff]\n\talgorithm = minimal\n\tmnemonicprefix = true\n" >> ./.git/config 
+printf "[core]\n\teditor = vim\n" >> ./.git/config 
+git init;
+git add .;
+git commit -m "Basic project structure";
+cp "{{ configResPath }}/pre-commit" "{{ projectPath }}/.git/hooks/";
+popd &> /dev/null;
+{% endif %}
+"""
+
 
 class BasicCMakeGenerator:
     CMakeFileName = "CMakeLists.txt"
+    templateName = "cmake/project.cmake"
 
-    def __init__(self, args, paths):
+    def __init__(self, args, paths, context=None):
         self.paths = paths
         self.minCMakeVersion = args.minCMakeVersion
         self.projectName = args.projectName
         self.cxxVersion = args.cppVersion
         self.defaultTargetType = args.defaultTargetType
+        self.templates = templateLoader(args)
+        self.context = context if context is not None else createTemplateContext(paths, args)
 
     def generateCMakeFileContent(self):
-        strIO = StringIO()
-
-        strIO.write("project(\"" + self.projectName + "\" VERSION 0.1.0 LANGUAGES CXX)\n")
-        strIO.write("\n")
-        strIO.write("set(CMAKE_CXX_STANDARD " + self.cxxVersion + ")\n")
-        strIO.write("set(CXX_STANDARD_REQUIRED ON)\n")
-        strIO.write("\n")
-        strIO.write("list(APPEND CMAKE_MODULE_PATH \"${CMAKE_CURRENT_LIST_DIR}/../../../cmakeSearchModule/\")\n")
-        strIO.write("#add_definitions(\"-DDEVELOPMENT_BUILD\")\n\n\n")
-        strIO.write("set(" + self.projectName.upper() + "_PUBLIC_HEADERS \"" + \
-               join(join("${CMAKE_CURRENT_LIST_DIR}", self.paths["pubHeaders"][len(self.projectName) + 1:]), self.projectName.lower()) + ".h\")\n")
-        strIO.write("set(" + self.projectName.upper() + "_PRIVATE_HEADERS \"" + join("${CMAKE_CURRENT_LIST_DIR}", self.paths["privHeaders"][len(self.projectName) + 1:]) + "\")\n")
-        strIO.write("set(" + self.projectName.upper() + "_SRC \"" + join(join("${CMAKE_CURRENT_LIST_DIR}", self.paths["src"][len(self.projectName) + 1:]), self.projectName.lower()) + ".cpp\")\n")
-        strIO.write("\n")
-
-        targetDestination="bin"
-        if self.defaultTargetType == "lib":
-            strIO.write("add_library(${PROJECT_NAME} "
-                             + " ${" + self.projectName.upper() + "_SRC}" \
-                             + " ${" + self.projectName.upper() + "_PUBLIC_HEADERS}" \
-                             + " ${" + self.projectName.upper() + "_PRIVATE_HEADERS}" \
-                             + ")\n")
-            targetDestination="lib"
-
-            strIO.write("if(BUILD_SHARED_LIBS)\n")
-            strIO.write("   set(INSTALL_TARGET_TYPE \"LIBRARY\")\n")
-            strIO.write("else()\n")
-            strIO.write("   set(INSTALL_TARGET_TYPE \"ARCHIVE\")\n")
-            strIO.write("endif()\n")
-        else:
-            strIO.write("add_executable(${PROJECT_NAME} "
-                             + " ${" + self.projectName.upper() + "_SRC}" \
-                             + " ${" + self.projectName.upper() + "_PUBLIC_HEADERS}" \
-                             + " ${" + self.projectName.upper() + "_PRIVATE_HEADERS}" \
-                             + ")\n")
-            strIO.write("set(INSTALL_TARGET_TYPE \"\")\n")
-
-        strIO.write("set_target_properties(${PROJECT_NAME} PROPERTIES PUBLIC_HEADER ${" + self.projectName.upper() + "_PUBLIC_HEADERS})\n")
-        strIO.write("target_include_directories(${PROJECT_NAME} PUBLIC\n" + \
-            "   $<BUILD_INTERFACE:" + join("${CMAKE_CURRENT_LIST_DIR}", self.paths["pubInc"][len(self.projectName) + 1:]) + ">\n" + \
-            "   $<INSTALL_INTERFACE:" + join("${CMAKE_CURRENT_LIST_DIR}", self.paths["pubInc"][len(self.projectName) + 1:]) + ">\n" + \
-            "   PRIVATE " + join("${CMAKE_CURRENT_LIST_DIR}", self.paths["privInc"][len(self.projectName) + 1:]) + \
-            ")\n")
-        strIO.write("install(TARGETS ${PROJECT_NAME} " + " ${INSTALL_TARGET_TYPE} DESTINATION \"" + targetDestination + "\" "+ \
-                " PUBLIC_HEADER DESTINATION \"include/" + self.projectName + "\")\n")
-
-        strIO.write("\n")
-
-        return strIO.getvalue()
+        return self.templates.render(self.templateName, self.context)
 
 
 class MainCMakeGenerator(BasicCMakeGenerator):
+    templateName = "CMakeLists.txt"
 
-    def __init__(self, args, paths):
-        super(MainCMakeGenerator, self).__init__(args, paths)
-
-    def generateCMakeFileContent(self):
-        from io import StringIO
-        strIO = StringIO()
-
-        strIO.write("# Copyright " + str(datetime.datetime.now().year) + " - " + str(datetime.datetime.now().year + 1) + " Szilard Orban, <devszilardo@gmail.com>\n")
-        strIO.write("# All rights reserved.\n")
-        strIO.write("cmake_minimum_required(VERSION " + self.minCMakeVersion  + ")\n")
-        strIO.write(super(MainCMakeGenerator, self).generateCMakeFileContent())
-
-        return strIO.getvalue()
+    def __init__(self, args, paths, context=None):
+        super(MainCMakeGenerator, self).__init__(args, paths, context)
 
 
 class TestCMakeGenerator():
-    def __init__(self, args, paths):
+    templateName = "test/CMakeLists.txt"
+
+    def __init__(self, args, paths, context=None):
         self.paths = paths
         self.minCMakeVersion = args.minCMakeVersion
         self.projectName = args.projectName
         self.cxxVersion = args.cppVersion
         self.defaultTargetType = args.defaultTargetType
+        self.templates = templateLoader(args)
+        self.context = context if context is not None else createTemplateContext(paths, args)
 
     def generateCMakeFileContent(self):
-        from io import StringIO
-        strIO = StringIO()
+        return self.templates.render(self.templateName, self.context)
 
-        strIO.write("""
-include("${CMAKE_CURRENT_LIST_DIR}/../../CMakeLists.txt")
 
-cmake_minimum_required(VERSION 3.8.2)\n""")
-        strIO.write("set(PROJECT_NAME \"" + self.projectName + "_test\")\n")
-        strIO.write("""
-project(${PROJECT_NAME} CXX)
+class BenchmarkCMakeGenerator(BasicCMakeGenerator):
+    templateName = "benchmark/CMakeLists.txt"
 
-set(CMAKE_CXX_STANDARD 14)
-list(APPEND CMAKE_MODULE_PATH "${CMAKE_CURRENT_LIST_DIR}/../../../cmakeSearchModule/")
+    def __init__(self, args, paths, context=None):
+        super(BenchmarkCMakeGenerator, self).__init__(args, paths, context)
 
-set(TEST_SOURCES "main.cpp")
-add_executable(${PROJECT_NAME} ${TEST_SOURCES})
 
-find_package(google_test REQUIRED)
+def generateDefaultEnvironmentScript(tree, paths, args, context):
+    tree.addFile(join(paths["scriptRes"], "defaultBaseEnvironment.sh"), templateLoader(args).render("scripts/defaultBaseEnvironment.sh", context), 0o770)
 
-set(LIBS "${google_test_LIBRARIES}" "pthread")
-target_link_libraries(${PROJECT_NAME} ${LIBS})
-target_include_directories(${PROJECT_NAME} PRIVATE ${google_test_INCLUDE_DIRS})
-""")
-        return strIO.getvalue()
-
-
-def generateDefaultEnvironmentScript(paths):
-    f = open(join(paths["scriptRes"], "defaultBaseEnvironment.sh"), "w")
-    f.write("#!/bin/bash\n\n")
-    f.write("export BASE_ENVIRONMENT_SCRIPT_PATH=\"$( cd \"$( dirname \"${BASH_SOURCE[0]}\" )\" && pwd )\";\n")
-    f.write("export BUILD_ROOT=\"${BASE_ENVIRONMENT_SCRIPT_PATH}/../../../build/\";\n")
-    f.write("export INSTALL_PREFIX=\"${BASE_ENVIRONMENT_SCRIPT_PATH}/../../../sysroot/\";\n")
-    f.write("export PROJECT_ROOT=\"${BASE_ENVIRONMENT_SCRIPT_PATH}/../../../\";\n")
-    f.close()
-    chmod(f.name, 0o770)
-
-
-def generateDefaultInitProjectScript(paths, args):
-    f = open(join(paths["scriptRes"], "defaultInitProject.sh"), "w")
-    f.write("#!/bin/bash\n")
-    f.write("SCRIPT_PATH=\"$( cd \"$( dirname \"${BASH_SOURCE[0]}\" )\" && pwd )\";\n")
-    f.write(". \"${SCRIPT_PATH}/defaultBaseEnvironment.sh\";\n")
-    f.write("mkdir -p \"${BUILD_ROOT}\";\n")
-    f.write("mkdir -p \"${INSTALL_PREFIX}\";\n")
-
-    projectPath = join("${PROJECT_ROOT}", paths["base"])
-
-    f.write("cp \"" + join("${PROJECT_ROOT}", join(paths["configRes"], ".clang-format\""))+ "  \"" + projectPath  + "\";\n")
-    f.write("cp \"" + join("${PROJECT_ROOT}", join(paths["configRes"], ".gitignore\""))+ "  \"" + projectPath + "\";\n")
-    f.write("cp \"" + join("${PROJECT_ROOT}", join(paths["configRes"], ".gitmessage\""))+ "  \"" + projectPath  + "\";\n\n")
-
-    f.write("pushd \"" + projectPath + "\" &> /dev/null;\n")
-    f.write("mkdir -p .git/hooks;\n")
-
-    f.write("printf \"[user]\\n\\tname = Szilard Orban\\n\\temail = devszilardo@gmail.com\\n\" > ./.git/config \n")
-    f.write("printf \"[commit]\\n\\ttemplate = \\\"" + join(projectPath, ".gitmessage") + "\\\"\\n\" >> ./.git/config \n")
-    f.write("printf \"[diff]\\n\\talgorithm = minimal\\n\\tmnemonicprefix = true\\n\" >> ./.git/config \n")
-    f.write("printf \"[core]\\n\\teditor = vim\\n\" >> ./.git/config \n")
-    f.write("git init;\n")
-    f.write("git add .;\n")
-    f.write("git commit -m \"Basic project structure\";\n")
-    f.write("cp \"" + join("${PROJECT_ROOT}", join(paths["configRes"], "pre-commit\""))+ " \"" + join(projectPath, ".git/hooks/") + "\";\n")
-    f.write("popd &> /dev/null;\n")
-    f.close()
-    chmod(f.name, 0o770)
-
-
-def generateGitPreCommitHook(paths):
-    f = open(join(paths["configRes"], "pre-commit"), "w")
-    f.write("""
-#!/bin/bash
+
+def generateDefaultInitProjectScript(tree, paths, args, context):
+    tree.addFile(join(paths["scriptRes"], "defaultInitProject.sh"), templateLoader(args).render("scripts/defaultInitProject.sh", context), 0o770)
+
+
+def renderGitPreCommitHook():
+    return """#!/bin/bash
 
 echo "Starting git pre-commit hook:";
-projectRoot="$(dirname $(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd))";
-projectRoot=${projectRoot%/*};
+startTime=`date +%s%N`;
 
 ## Check source code format
-gitTmpName=".xgitTmp";
-stagedFiles="`git diff --staged --name-only`";
-currentBranchName="`git rev-parse --abbrev-ref HEAD`";
+if ! command -v clang-format &> /dev/null; then
+    echo "NOO! clang-format was not found, the format of the staged files can't be checked!";
+    exit 255;
+fi
 
-mkdir -p "${gitTmpName}";
-success=1;
-for stagedFile in `git diff --diff-filter=MCUBTAXR --staged --name-only | grep -E "\.h$|\.cpp$|\.c$|\.hpp$|\.cxx"`; do
-    mkdir -p $(dirname "${gitTmpName}/${stagedFile}");
-    git show :"${stagedFile}" | clang-format -style=file > "${gitTmpName}/${stagedFile}";
-    originalHash=`git show :"${stagedFile}" | md5sum | cut -d " " -f 1`;
-    formattedHash=`md5sum "${gitTmpName}/${stagedFile}" | cut -d " " -f 1`;
-    if [ "${originalHash}" != "${formattedHash}" ]; then
-        echo "${stagedFile}";
-        success=0;
+# Blobs that are known to be formatted correctly are cached for the current .clang-format and clang-format version.
+gitDir="`git rev-parse --git-dir`";
+formatHash="`(cat .clang-format 2> /dev/null; clang-format --version) | git hash-object --stdin`";
+cacheFile="${gitDir}/clang-format-cache/${formatHash}";
+mkdir -p "${gitDir}/clang-format-cache";
+touch "${cacheFile}";
+
+declare -A formattedBlobs;
+while read -r blob; do
+    formattedBlobs["${blob}"]=1;
+done < "${cacheFile}";
+
+gitTmpName="`mktemp -d "${gitDir}/xgitTmp.XXXXXX"`";
+trap 'rm -rf "${gitTmpName}"' EXIT;
+
+stagedCount=0;
+cachedCount=0;
+toCheck=();
+while IFS= read -r -d '' status && IFS= read -r -d '' stagedFile; do
+    if ! [[ "${stagedFile}" =~ \\.(h|hpp|c|cpp|cxx)$ ]]; then
+        continue;
     fi
-done
+    stagedCount=$((stagedCount + 1));
+    blob="`echo "${status}" | cut -d " " -f 4`";
+    if [ -n "${formattedBlobs[${blob}]}" ]; then
+        cachedCount=$((cachedCount + 1));
+    else
+        toCheck+=("${blob}" "${stagedFile}");
+    fi
+done < <(git diff --staged --raw --no-abbrev --no-renames -z --diff-filter=ACMTU);
 
-rm -rf "${gitTmpName}";
+success=1;
+if [ "${#toCheck[@]}" -gt 0 ]; then
+    # Write every staged version into the temporary tree with a single git process
+    for ((i = 1; i < ${#toCheck[@]}; i += 2)); do
+        printf "%s\\0" "${toCheck[$i]}";
+    done | git checkout-index --prefix="${gitTmpName}/" -z --stdin;
+
+    checkFormat() {
+        if clang-format -style=file -assume-filename="$2" < "${gitTmpName}/$2" | cmp -s - "${gitTmpName}/$2"; then
+            echo "ok $1";
+        else
+            echo "bad $2";
+        fi
+    }
+    export -f checkFormat;
+    export gitTmpName;
+
+    while read -r result value; do
+        if [ "${result}" == "ok" ]; then
+            echo "${value}" >> "${cacheFile}";
+        else
+            echo "${value}";
+            success=0;
+        fi
+    done < <(printf "%s\\0" "${toCheck[@]}" | xargs -0 -n 2 -P "${PRE_COMMIT_JOBS:-`nproc 2> /dev/null || echo 4`}" bash -c 'checkFormat "$1" "$2"' checkFormat);
+fi
+
+elapsed=$(( (`date +%s%N` - startTime) / 1000000 ));
+echo "Checked ${stagedCount} staged files (${cachedCount} cached) in ${elapsed} ms.";
 if [ "$success" -eq 0 ]; then
     echo "NOO! The above files were not formatted correctly, please run clang-format with the appropriate settings before attempting a commit!";
     exit 255;
 fi
 
 echo "Pre-commit hook passed successfully!";
-exit 0;\n
-""")
-    f.close()
-    chmod(f.name, 0o770)
+exit 0;
+"""
 
 
-def generateGitMessage(paths):
-    f = open(join(paths["configRes"], ".gitmessage"), "w")
+def generateGitPreCommitHook(tree, paths, content=None):
+    tree.addSharedFile(join(paths["configRes"], "pre-commit"), content if content is not None else renderGitPreCommitHook(), 0o770)
+
+
+def renderGitMessage():
+    f = StringIO()
     f.write("######################################### Short Description [ 80 chars max ] ###########################################\n")
     f.write("#================================ 80 characters ================================#                                      #\n")
     f.write("## Short description about the change topic. Should be made on a single line.                                         ##\n")
@@ -232,11 +2387,15 @@ def generateGitMessage(paths):
     f.write("\n")
     f.write("##                                                                                                                    ##\n")
     f.write("########################################################################################################################\n")
-    f.close()
+    return f.getvalue()
+
 
+def generateGitMessage(tree, paths, content=None):
+    tree.addSharedFile(join(paths["configRes"], ".gitmessage"), content if content is not None else renderGitMessage())
 
-def generateGitIgnore(paths):
-    f = open(join(paths["configRes"], ".gitignore"), "w")
+
+def renderGitIgnore():
+    f = StringIO()
     f.write(".DS_Store\n")
     f.write(".*.swp")
     f.write("*.slo\n")
@@ -267,12 +2426,16 @@ def generateGitIgnore(paths):
     f.write("ui_*.h\n")
     f.write("*.qbs.user.*\n")
     f.write("*.qbs.user\n")
-    f.close()
+    f.write(SourceIndex.FileName + "\n")
+    return f.getvalue()
+
+
+def generateGitIgnore(tree, paths, content=None):
+    tree.addSharedFile(join(paths["configRes"], ".gitignore"), content if content is not None else renderGitIgnore())
 
 
-def generateDefaultClangFormatConfig(paths):
-    f = open(join(paths["configRes"], ".clang-format"), "w")
-    f.write("---\n" +
+def renderDefaultClangFormatConfig():
+    return ("---\n" +
         "Language:        Cpp\n" +
         "AccessModifierOffset: -4\n" +
         "AlignAfterOpenBracket: Align\n" +
@@ -356,10 +2519,18 @@ def generateDefaultClangFormatConfig(paths):
         "SpaceBeforeParens: ControlStatements\n" +
         "DisableFormat:   false\n" +
         "...\n")
-    f.close()
 
 
-def generatePaths(args):
+def generateDefaultClangFormatConfig(tree, paths, content=None):
+    tree.addSharedFile(join(paths["configRes"], ".clang-format"), content if content is not None else renderDefaultClangFormatConfig())
+
+
+def renderSharedResources():
+    return { ".clang-format" : renderDefaultClangFormatConfig(), ".gitignore" : renderGitIgnore(), \
+             ".gitmessage" : renderGitMessage(), "pre-commit" : renderGitPreCommitHook() }
+
+
+def generatePaths(tree, args):
     base = args.projectName
 
     docs = join(base, "documentation")
@@ -377,6 +2548,7 @@ def generatePaths(args):
     privHeaders = join(privInc, base.lower())
     src = join(code, "src")
     test = join(code, "test")
+    benchmark = join(code, "benchmark")
 
     paths = { "base": base, "docs": docs, "code" : code, "pub" : pub, "priv" : priv,\
               "pubHeaders" : pubHeaders, "privHeaders" : privHeaders, "src" : src, \
@@ -384,116 +2556,853 @@ def generatePaths(args):
               "scriptRes" : scriptRes, "configRes" : configRes }
 
     for name, d in paths.items():
-        os.makedirs(d, 0o755, True)
-
-    return paths
-
+        tree.addDirectory(d)
 
-def generateCMakeFiles(paths, args):
-    cmakeGenerator = MainCMakeGenerator(args, paths)
-    testCmakeGenerator = TestCMakeGenerator(args, paths)
+    paths["benchmark"] = benchmark
+    if args.withBenchmarks:
+        tree.addDirectory(benchmark)
 
-    f = open(join(paths["base"], MainCMakeGenerator.CMakeFileName), "w")
-    f.write(cmakeGenerator.generateCMakeFileContent())
-    f.close()
-
-    f = open(join(paths["test"], MainCMakeGenerator.CMakeFileName), "w")
-    f.write(testCmakeGenerator.generateCMakeFileContent())
-    f.close()
-
-
-def generateDefaultSourceFiles(paths, args):
-    f = open(join(paths["pubHeaders"], args.projectName.lower()) + ".h", "w")
-    f.write("#ifndef " + args.projectName.upper() + "_H\n")
-    f.write("#define " + args.projectName.upper() + "_H\n\n")
-    f.write("#endif\n\n")
-    f.close()
+    return paths
 
-    f = open(join(paths["src"], args.projectName.lower()) + ".cpp", "w")
-    f.write("#include \"" + join(args.projectName.lower(), args.projectName.lower()) + ".h\"\n")
-    f.close()
 
-    f = open(join(paths["test"], "main.cpp"), "w")
-    f.write("""
-#include "gtest/gtest.h"
+def generateCMakeFiles(tree, paths, args, context):
+    cmakeGenerator = MainCMakeGenerator(args, paths, context)
+    testCmakeGenerator = TestCMakeGenerator(args, paths, context)
+
+    tree.addFile(join(paths["base"], MainCMakeGenerator.CMakeFileName), cmakeGenerator.generateCMakeFileContent())
+    tree.addFile(join(paths["test"], MainCMakeGenerator.CMakeFileName), testCmakeGenerator.generateCMakeFileContent())
+    if args.withBenchmarks:
+        tree.addFile(join(paths["benchmark"], MainCMakeGenerator.CMakeFileName), BenchmarkCMakeGenerator(args, paths, context).generateCMakeFileContent())
+
+
+def generateDefaultSourceFiles(tree, paths, args, context):
+    templates = templateLoader(args)
+    tree.addFile(join(paths["pubHeaders"], args.projectName.lower()) + ".h", templates.render("header.h", context), userEditable=True)
+    tree.addFile(join(paths["src"], args.projectName.lower()) + ".cpp", templates.render("source.cpp", context), userEditable=True)
+    tree.addFile(join(paths["test"], "main.cpp"), templates.render("test/main.cpp", context), userEditable=True)
+    if args.withBenchmarks:
+        tree.addFile(join(paths["benchmark"], "main.cpp"), templates.render("benchmark/main.cpp", context), userEditable=True)
+    if args.withTracing:
+        tree.addFile(join(paths["pubHeaders"], "tracing.h"), templates.render("tracing/tracing.h", context))
+        tree.addFile(join(paths["src"], "tracing.cpp"), templates.render("tracing/tracing.cpp", context))
+        tree.addFile(join(paths["test"], "tracingTest.cpp"), templates.render("tracing/tracingTest.cpp", context))
+
+    codebase = context["syntheticCodebase"]
+    if codebase:
+        for module in codebase["modules"]:
+            tree.addDirectory(join(paths["pubHeaders"], module["name"]))
+            tree.addDirectory(join(paths["src"], module["name"]))
+        headerContext = dict(context)
+        for header in codebase["headers"]:
+            headerContext["header"] = header
+            tree.addFile(join(paths["pubHeaders"], header["path"]), templates.render("synthetic/header.h", headerContext))
+        sourceContext = dict(context)
+        for source in codebase["sources"]:
+            sourceContext["source"] = source
+            tree.addFile(join(paths["src"], source["path"]), templates.render("synthetic/source.cpp", sourceContext))
+
+
+## Source list
+sourceListFileName = "sources.cmake"
+sourceListRoots = [join("code", "src"), join("code", "public", "include"), join("code", "private", "include")]
+sourceExtensions = (".cpp", ".cc", ".cxx")
+headerExtensions = (".h", ".hh", ".hpp", ".hxx", ".inl", ".ipp")
+
+
+# Splits the files of the source list roots into the sources, the public and the private headers. Only the headers
+# directly in code/public/include/<name> are public, PUBLIC_HEADER would flatten the deeper ones when installing.
+def classifySourceFiles(relPaths):
+    sources, publicHeaders, privateHeaders = [], [], []
+    for relPath in sorted(relPaths):
+        parts = relPath.split(os.sep)
+        extension = os.path.splitext(relPath)[1]
+        if parts[:2] == ["code", "src"]:
+            if extension in sourceExtensions:
+                sources.append(relPath)
+            elif extension in headerExtensions:
+                privateHeaders.append(relPath)
+        elif extension not in headerExtensions:
+            continue
+        elif parts[:3] == ["code", "public", "include"]:
+            (publicHeaders if len(parts) == 5 else sources).append(relPath)
+        elif parts[:3] == ["code", "private", "include"]:
+            privateHeaders.append(relPath)
+    return { "sources" : sources, "publicHeaders" : publicHeaders, "privateHeaders" : privateHeaders }
+
+
+def renderSourceList(templates, projectName, relPaths):
+    context = { "projectNameUpper" : projectName.upper() }
+    for name, files in classifySourceFiles(relPaths).items():
+        context[name] = [join("${CMAKE_CURRENT_LIST_DIR}", relPath) for relPath in files]
+    return templates.render("cmake/sources.cmake", context).encode("utf-8")
+
+
+# Persistent directory listing of the source list roots. A directory is only listed again when its mtime changed,
+# adding, removing or renaming a file changes the mtime of its directory, editing it doesn't. The source list is
+# tracked with its mtime and hash, so an unchanged list is neither read nor rewritten.
+class SourceIndex:
+    FileName = ".sourceIndex.json"
+    Version = 1
+
+    def __init__(self, base):
+        self.base = base
+        self.oldDirectories = {}
+        self.directories = {}
+        self.timestamp = 0
+        self.sourceList = {}
+        self.scanned = 0
+
+    def path(self):
+        return join(self.base, SourceIndex.FileName)
+
+    def load(self):
+        try:
+            with open(self.path(), "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if index.get("version") != SourceIndex.Version:
+            return
+        self.oldDirectories = index.get("directories", {})
+        self.timestamp = index.get("timestamp", 0)
+        self.sourceList = index.get("sourceList", {})
+
+    def render(self):
+        index = { "version" : SourceIndex.Version, "timestamp" : self.timestamp, "directories" : self.directories, "sourceList" : self.sourceList }
+        return (json.dumps(index, indent=4, sort_keys=True) + "\n").encode("utf-8")
+
+    def scanDirectory(self, relDir):
+        try:
+            mtime = os.stat(join(self.base, relDir)).st_mtime_ns
+        except FileNotFoundError:
+            return
+        entry = self.oldDirectories.get(relDir)
+        # A directory modified after the previous scan started may have changed again within the same mtime
+        if entry is None or entry["mtime"] != mtime or mtime >= self.timestamp:
+            files, directories = [], []
+            with os.scandir(join(self.base, relDir)) as it:
+                for dirEntry in it:
+                    if dirEntry.name.startswith("."):
+                        continue
+                    if dirEntry.is_dir():
+                        directories.append(dirEntry.name)
+                    elif dirEntry.name.endswith(sourceExtensions + headerExtensions):
+                        files.append(dirEntry.name)
+            entry = { "mtime" : mtime, "files" : sorted(files), "directories" : sorted(directories) }
+            self.scanned += 1
+        self.directories[relDir] = entry
+        for name in entry["directories"]:
+            self.scanDirectory(join(relDir, name))
+
+    # Returns the paths of the listed files relative to the project
+    def scan(self):
+        scanTime = time.time_ns()
+        for root in sourceListRoots:
+            self.scanDirectory(root)
+        if self.scanned:
+            self.timestamp = scanTime
+        return self.files(self.directories)
+
+    def files(self, directories):
+        return set(join(relDir, name) for relDir, entry in directories.items() for name in entry["files"])
+
+
+def generateSourceList(tree, paths, args, context):
+    relPaths = set(os.path.relpath(path, paths["base"]) for path in tree.files)
+    # Keep the files added since the previous generation
+    if args.update:
+        relPaths |= SourceIndex(paths["base"]).scan()
+    tree.addFile(join(paths["base"], sourceListFileName), renderSourceList(templateLoader(args), args.projectName, relPaths))
+
+
+def generateMakeScript(tree, paths, args, context):
+    templates = templateLoader(args)
+    tree.addFile(join(paths["base"], "build.sh"), templates.render("build.sh", context), 0o770)
+    tree.addFile(join(paths["scriptRes"], "buildTimingReport.py"), templates.render("scripts/buildTimingReport.py", context), 0o770)
+    if args.withBenchmarks:
+        tree.addFile(join(paths["scriptRes"], "compareBenchmarks.py"), templates.render("scripts/compareBenchmarks.py", context), 0o770)
+
+
+## Git repository
+# Builds the repository of a project in memory, the objects of the initial commit are stored in a single pack so
+# creating a repository doesn't need any git process.
+class GitRepository:
+    ObjectTypes = { "commit" : 1, "tree" : 2, "blob" : 3 }
+
+    def __init__(self):
+        self.objects = {}
+
+    def addObject(self, objectType, content):
+        objectId = hashlib.sha1(objectType.encode("ascii") + b" " + str(len(content)).encode("ascii") + b"\0" + content).digest()
+        self.objects[objectId] = (objectType, content)
+        return objectId
+
+    # Entries are (name, mode, objectId), git orders the subtrees as if their names ended with a slash
+    def addTree(self, entries):
+        entries = sorted(entries, key=lambda entry: entry[0] + ("/" if entry[1] == "40000" else ""))
+        return self.addObject("tree", b"".join(mode.encode("ascii") + b" " + name.encode("utf-8") + b"\0" + objectId \
+                                                for name, mode, objectId in entries))
+
+    def addCommit(self, treeId, identity, message):
+        return self.addObject("commit", ("tree " + treeId.hex() + "\nauthor " + identity + "\ncommitter " + identity + \
+                                         "\n\n" + message).encode("utf-8"))
+
+    # Adds the blobs and the trees of the files, returns the id of the root tree and the index entries
+    def addFiles(self, files):
+        directories = { "" : [] }
+        indexEntries = []
+        for path, (content, mode) in sorted(files.items()):
+            blobId = self.addObject("blob", content)
+            fileMode = "100755" if mode is not None and mode & 0o111 else "100644"
+            indexEntries.append((path, int(fileMode, 8), blobId, len(content)))
+            directory, name = os.path.split(path)
+            directories.setdefault(directory, []).append((name, fileMode, blobId))
+        for directory in list(directories):
+            while directory:
+                parent, name = os.path.split(directory)
+                parentEntries = directories.setdefault(parent, [])
+                if (name, "40000", None) in parentEntries:
+                    break
+                parentEntries.append((name, "40000", None))
+                directory = parent
+
+        treeIds = {}
+        for directory in sorted(directories, key=lambda directory: directory.count("/") + (directory != ""), reverse=True):
+            entries = [(name, mode, objectId if objectId is not None else treeIds[join(directory, name)]) \
+                       for name, mode, objectId in directories[directory]]
+            treeIds[directory] = self.addTree(entries)
+        return treeIds[""], indexEntries
+
+    def packObjectHeader(self, objectType, size):
+        header = bytearray()
+        byte = (GitRepository.ObjectTypes[objectType] << 4) | (size & 0x0f)
+        size >>= 4
+        while size:
+            header.append(byte | 0x80)
+            byte = size & 0x7f
+            size >>= 7
+        header.append(byte)
+        return bytes(header)
+
+    # Returns the pack file and its version 2 index
+    def renderPack(self):
+        pack = bytearray(b"PACK" + struct.pack(">II", 2, len(self.objects)))
+        offsets = {}
+        crcs = {}
+        for objectId, (objectType, content) in self.objects.items():
+            packedObject = self.packObjectHeader(objectType, len(content)) + zlib.compress(content, 1)
+            offsets[objectId] = len(pack)
+            crcs[objectId] = zlib.crc32(packedObject)
+            pack += packedObject
+        packChecksum = hashlib.sha1(pack).digest()
+        pack += packChecksum
+
+        objectIds = sorted(self.objects)
+        fanout = [0] * 256
+        for objectId in objectIds:
+            fanout[objectId[0]] += 1
+        for index in range(1, 256):
+            fanout[index] += fanout[index - 1]
+        packIndex = bytearray(b"\377tOc" + struct.pack(">I", 2) + struct.pack(">256I", *fanout))
+        packIndex += b"".join(objectIds)
+        packIndex += b"".join(struct.pack(">I", crcs[objectId]) for objectId in objectIds)
+        packIndex += b"".join(struct.pack(">I", offsets[objectId]) for objectId in objectIds)
+        packIndex += packChecksum
+        packIndex += hashlib.sha1(packIndex).digest()
+        return bytes(pack), bytes(packIndex), packChecksum.hex()
+
+    # Version 2 index without stat data, git refreshes it from the work tree the first time it is used
+    def renderIndex(self, indexEntries):
+        index = bytearray(b"DIRC" + struct.pack(">II", 2, len(indexEntries)))
+        for path, mode, blobId, size in sorted(indexEntries, key=lambda entry: entry[0].encode("utf-8")):
+            name = path.encode("utf-8")
+            entry = struct.pack(">10I", 0, 0, 0, 0, 0, 0, mode, 0, 0, size) + blobId + struct.pack(">H", min(len(name), 0xfff)) + name
+            index += entry + b"\0" * (8 - len(entry) % 8)
+        index += hashlib.sha1(index).digest()
+        return bytes(index)
+
+
+def gitIdentityPart(value):
+    for invalidToken in ["<", ">", "\"", "$", "`", "\\", "\n"]:
+        if invalidToken in value:
+            raise argparse.ArgumentTypeError("the git author can't contain " + repr(invalidToken))
+    return value
+
+
+def gitBranchName(value):
+    if not re.match(r"^[A-Za-z0-9_][A-Za-z0-9._/-]*$", value) or ".." in value or "//" in value or value.endswith((".", "/", ".lock")):
+        raise argparse.ArgumentTypeError("invalid branch name " + repr(value))
+    return value
+
+
+def renderGitConfig(args, commitTemplatePath):
+    return "[core]\n\trepositoryformatversion = 0\n\tfilemode = true\n\tbare = false\n\tlogallrefupdates = true\n\teditor = vim\n" \
+           "[user]\n\tname = " + args.gitAuthorName + "\n\temail = " + args.gitAuthorEmail + "\n" \
+           "[commit]\n\ttemplate = \"" + commitTemplatePath + "\"\n" \
+           "[diff]\n\talgorithm = minimal\n\tmnemonicprefix = true\n"
+
+
+# Does what the init project script does with git init, add and commit, from the content that is already in the tree
+def generateInitialCommit(tree, paths, args):
+    for name in [".clang-format", ".gitignore", ".gitmessage"]:
+        content, mode, userEditable = tree.files[join(paths["configRes"], name)]
+        tree.addSharedFile(join(paths["base"], name), content, mode)
+    # An existing repository is never touched by an update
+    gitDir = join(paths["base"], ".git")
+    if args.update and os.path.exists(gitDir):
+        return
+
+    manifest = tree.renderManifest(tree.createManifest(tree.fileEntries()))
+    files = { os.path.relpath(path, paths["base"]) : (content, mode) for path, (content, mode, userEditable) in tree.files.items() }
+    files[ProjectTree.ManifestFileName] = (manifest, None)
+
+    repository = GitRepository()
+    rootTreeId, indexEntries = repository.addFiles(files)
+    offset = time.localtime().tm_gmtoff
+    identity = "{} <{}> {} {}{:02d}{:02d}".format(args.gitAuthorName, args.gitAuthorEmail, int(time.time()), \
+                                                  "-" if offset < 0 else "+", abs(offset) // 3600, abs(offset) % 3600 // 60)
+    message = "Basic project structure"
+    commitId = repository.addCommit(rootTreeId, identity, message + "\n").hex()
+    pack, packIndex, packName = repository.renderPack()
+
+    for directory in ["hooks", "info", "objects/info", "objects/pack", "refs/heads", "refs/tags", "logs/refs/heads"]:
+        tree.addDirectory(join(gitDir, directory))
+    branchRef = "refs/heads/" + args.gitBranch
+    commitTemplatePath = ".gitmessage" if args.archive else os.path.abspath(join(paths["base"], ".gitmessage"))
+    reflog = "0" * 40 + " " + commitId + " " + identity + "\tcommit (initial): " + message + "\n"
+    tree.addUnmanagedFile(join(gitDir, "HEAD"), "ref: " + branchRef + "\n")
+    tree.addUnmanagedFile(join(gitDir, "config"), renderGitConfig(args, commitTemplatePath))
+    tree.addUnmanagedFile(join(gitDir, "hooks", "pre-commit"), tree.files[join(paths["configRes"], "pre-commit")][0], 0o770)
+    tree.addUnmanagedFile(join(gitDir, "objects", "pack", "pack-" + packName + ".pack"), pack, 0o444)
+    tree.addUnmanagedFile(join(gitDir, "objects", "pack", "pack-" + packName + ".idx"), packIndex, 0o444)
+    tree.addUnmanagedFile(join(gitDir, "index"), repository.renderIndex(indexEntries))
+    tree.addUnmanagedFile(join(gitDir, branchRef), commitId + "\n")
+    tree.addUnmanagedFile(join(gitDir, "logs", "HEAD"), reflog)
+    tree.addUnmanagedFile(join(gitDir, "logs", branchRef), reflog)
+
+
+invalidNameTokens =  ["/", "\\", ":", ",", "<", ">", "[", "]", "{", "}", "|", "'", "\"", ";", "=", "+", "*", "!", "@", "#", "$", "%", "^", "&", "(", ")"]
+
+
+def isValidProjectName(projectName):
+    for invalidToken in invalidNameTokens:
+        if invalidToken in projectName:
+            return False
+    return True
 
-int main(int argc, char** argv)
-{
-    ::testing::InitGoogleTest(&argc, argv);
-    return RUN_ALL_TESTS();
-}
-""")
-    f.close()
-
-
-def generateMakeScript(paths, args):
-    f = open(join(paths["base"], "build.sh"), "w")
-    f.write("#!/bin/bash\n\n")
-    f.write("echo \"Building: " + args.projectName + "\";\n")
-    f.write("PROJECT_PATH=\"$( cd \"$( dirname \"${BASH_SOURCE[0]}\" )\" && pwd )\"\n")
-    f.write(". ${PROJECT_PATH}/../baseEnvironment.sh;\n\n")
-    f.write("mkdir -p \"" + join("${BUILD_ROOT}", args.projectName) + "\";\n")
-    f.write("which ctime 2> /dev/null;\n")
-    f.write("HAVE_CTIME=$?;\n\n")
-
-    f.write("pushd \"" + join("${BUILD_ROOT}", args.projectName) + "\";\n\n")
-    f.write("if [ \"${HAVE_CTIME}\" -eq \"0\" ]; then ctime -begin " + args.projectName + ".ct; fi\n")
-    f.write("""
-cmake -DCMAKE_INSTALL_PREFIX:PATH=\"${INSTALL_PREFIX}\" -DBUILD_SHARED_LIBS:BOOL=ON -G Ninja \"${PROJECT_PATH}\";
-configOk=$?;
-ninja;
-buildOk=$?;
-ninja install;
-installOk=$?;
 
-if [ "$1" == "test" ]; then
-mkdir -p ./test;
-pushd test;
-    cmake -DCMAKE_INSTALL_PREFIX:PATH="${INSTALL_PREFIX}" -DBUILD_SHARED_LIBS:BOOL=ON -G Ninja "${PROJECT_PATH}/code/test";
-    testConfigOk=$?;
-    ninja;
-    testBuildOk=$?;
-    ninja install;
-    testInstallOk=$?;
-popd;
-echo "==== Build Tests finished, config: ${testConfigOk}, build: ${testBuildOk}, install: ${testInstallOk}!";
-fi\n""")
-
-    f.write("if [ \"${HAVE_CTIME}\" -eq \"0\" ]; then ctime -end " + args.projectName + ".ct; fi\n")
-    f.write("if [ \"${HAVE_CTIME}\" -eq \"0\" ]; then ctime -stats " + args.projectName + ".ct; fi\n\n")
-
-    f.write("popd 2&>1 /dev/null;\n\n")
-    f.write("echo \"==== Build " + args.projectName + " finished, config: ${configOk}, build: ${buildOk}, install: ${installOk}!\";");
-    f.close()
-    chmod(f.name, 0o770)
+# Arguments that only control how a project is written, they are not recorded in the generator manifest
+outputOnlySettings = ["update", "archive", "archiveFormat", "templateCacheDir", "profile"]
 
 
-if __name__ == "__main__":
-    print("Generating your project!\n")
+def generateProject(args, sharedResources=None):
+    if sharedResources is None:
+        sharedResources = renderSharedResources()
 
-    argParser = argparse.ArgumentParser(description="Generates the base structure of a new c++ project.")
+    tree = ProjectTree(args.projectName)
+    if args.resourceStore and not args.archive:
+        tree.resourceStore = ResourceStore(args.resourceStore)
+    profiler = GenerationProfiler(tree, getattr(args, "profile", None) is not None)
+    tree.profiler = profiler
+    with profiler.stage("generatePaths"):
+        paths = generatePaths(tree, args)
+    args.projectName = args.projectName.replace(" ", "_")
+    args.dependsOn = [dependency.replace(" ", "_") for dependency in args.dependsOn]
+    tree.settings = { key : value for key, value in vars(args).items() if key not in outputOnlySettings }
+    with profiler.stage("createTemplateContext"):
+        context = createTemplateContext(paths, args)
+
+    steps = [ (generateCMakeFiles, (args, context)), \
+              (generateMakeScript, (args, context)), \
+              (generateDefaultSourceFiles, (args, context)), \
+              (generateSourceList, (args, context)), \
+              (generateDefaultClangFormatConfig, (sharedResources[".clang-format"],)), \
+              (generateGitIgnore, (sharedResources[".gitignore"],)), \
+              (generateGitMessage, (sharedResources[".gitmessage"],)), \
+              (generateGitPreCommitHook, (sharedResources["pre-commit"],)), \
+              (generateDefaultEnvironmentScript, (args, context)), \
+              (generateDefaultInitProjectScript, (args, context)) ]
+    if args.gitInit:
+        steps.append((generateInitialCommit, (args,)))
+    for step, stepArgs in steps:
+        with profiler.stage(step.__name__):
+            step(tree, paths, *stepArgs)
+
+    if args.archive:
+        with profiler.stage("writeArchive"):
+            tree.writeArchive(args.archive, args.archiveFormat or archiveFormatFromPath(args.archive))
+    elif args.update:
+        with profiler.stage("update"):
+            tree.update()
+    else:
+        with profiler.stage("flush"):
+            tree.flush()
+    return tree
+
+
+def archiveFormatFromPath(path):
+    for archiveFormat in ["tar.gz", "zip"]:
+        if path.endswith("." + archiveFormat):
+            return archiveFormat
+    if path.endswith(".tgz"):
+        return "tar.gz"
+    return "tar"
+
+
+def positiveInt(value):
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError("expected a positive number, got " + value)
+    return number
+
+
+# Names of the arguments given in argv, when updating the other ones come from the settings of the previous generation
+def explicitArguments(argv):
+    argParser = createArgParser()
+    for action in argParser._actions:
+        action.default = argparse.SUPPRESS
+    return set(vars(argParser.parse_args(argv)))
+
+
+def applySavedSettings(args, argv, projectDir):
+    settings = ProjectTree(projectDir).loadManifest().get("settings", {})
+    explicit = explicitArguments(argv)
+    for key, value in settings.items():
+        if key != "projectName" and key not in explicit and key not in outputOnlySettings and hasattr(args, key):
+            setattr(args, key, value)
+
+
+def createArgParser():
+    argParser = argparse.ArgumentParser(description="Generates the base structure of a new c++ project.", \
+                                        epilog="Use '%(prog)s batch --help' to generate many projects from a manifest, " \
+                                               "'%(prog)s workspace --help' to build the generated projects together and " \
+                                               "'%(prog)s gc --help' to clean up a resource store.")
     argParser.add_argument("projectName", help="The alphanum name of your new project.")
     argParser.add_argument("--cppVersion", help="The c++ standard that the project should use. Default is 17.", choices=["03","11","14","17"], default="17")
     argParser.add_argument("--minCMakeVersion", default="3.10.0", help="CMake version requirement.")
     argParser.add_argument("--defaultTargetType", choices=["lib", "exec"], default="lib", help="The type of target that will be built in the project(library, executable). Default value is library.")
-    args = argParser.parse_args()
-
-    invalidNameTokens =  ["/", "\\", ":", ",", "<", ">", "[", "]", "{", "}", "|", "'", "\"", ";", "=", "+", "*", "!", "@", "#", "$", "%", "^", "&", "(", ")"]
-    for invalidToken in invalidNameTokens:
-        if invalidToken in args.projectName:
-            print("Error: Invalid project name specified, please don't use any of the following characters: " + "".join(invalidNameTokens))
-            print("       Try to use alphanum characters instead!")
+    argParser.add_argument("--compilerLauncher", choices=["ccache", "sccache"], help="Compiler launcher used when it is available at configure time.")
+    argParser.add_argument("--unityBuild", nargs="?", type=positiveInt, const=8, metavar="BATCH_SIZE", help="Build the targets as unity builds. Default batch size is 8.")
+    argParser.add_argument("--pch", nargs="+", default=[], metavar="HEADER", help="Headers precompiled for the targets, e.g. vector '<map>' '\"foo/foo.h\"' code/public/include/foo/foo.h.")
+    argParser.add_argument("--testLayout", choices=["nested", "subdirectory"], default="nested", help="nested: the tests are a separate CMake project that builds its own copy of the project. " \
+                           "subdirectory: the tests are part of the main configure and run through ctest. Default is nested.")
+    argParser.add_argument("--ctestParallel", type=positiveInt, help="Number of tests ctest runs in parallel with the subdirectory test layout. Default is the build job count.")
+    argParser.add_argument("--testTimeout", type=positiveInt, default=300, help="Timeout of a single test in seconds with the subdirectory test layout. Default is 300.")
+    argParser.add_argument("--jobPools", action="store_true", help="Limit the concurrent compile and link jobs with Ninja job pools, build.sh sizes them from the cores " \
+                                                                     "and the available memory.")
+    argParser.add_argument("--compileJobMemory", type=positiveInt, default=1024, metavar="MB", help="Memory reserved for a compile job with --jobPools. Default is 1024.")
+    argParser.add_argument("--linkJobMemory", type=positiveInt, default=4096, metavar="MB", help="Memory reserved for a link job with --jobPools. Default is 4096.")
+    argParser.add_argument("--lto", action="store_true", help="Build the target with link time optimization(INTERPROCEDURAL_OPTIMIZATION) when the compiler supports it.")
+    argParser.add_argument("--pgo", action="store_true", help="Add the 'build.sh pgo' profile guided optimization workflow: instrumented build, training run, optimized build.")
+    argParser.add_argument("--pgoTrainingCommand", metavar="COMMAND", help="Training command of 'build.sh pgo', evaluated in the instrumented build directory(PGO_GENERATE_PATH). " \
+                                                                        "Default is the benchmarks, the subdirectory tests, the executable or the nested tests of the project.")
+    argParser.add_argument("--withTracing", action="store_true", help="Add a tracing header with scope macros recording into per thread ring buffers, the recorded " \
+                                                                        "events are written as Chrome trace event JSON. Needs c++11 or newer.")
+    argParser.add_argument("--withBenchmarks", action="store_true", help="Add a Google Benchmark target in code/benchmark, 'build.sh bench' runs it and compares the results " \
+                                                                           "against the stored baseline.")
+    argParser.add_argument("--benchmarkThreshold", type=float, default=10.0, metavar="PERCENT", help="Slowdown compared to the baseline above which 'build.sh bench' fails. Default is 10.")
+    argParser.add_argument("--syntheticSources", type=positiveInt, metavar="N", help="Generate a synthetic codebase with N translation units for build system load tests.")
+    argParser.add_argument("--syntheticHeaders", type=positiveInt, metavar="M", help="Number of headers of the synthetic codebase. Default is the number of translation units.")
+    argParser.add_argument("--syntheticModules", type=positiveInt, default=1, help="Number of modules the synthetic codebase is split into, each module depends on " \
+                                                                                  "some of the previous ones. Default is 1.")
+    argParser.add_argument("--includeFanOut", type=positiveInt, default=4, help="Number of headers included by every synthetic header and source. Default is 4.")
+    argParser.add_argument("--templateDepth", type=positiveInt, default=3, help="Depth of the recursive template instantiated by every synthetic header. Default is 3.")
+    argParser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic codebase, the same seed always generates the same codebase. Default is 0.")
+    argParser.add_argument("--dependsOn", nargs="+", default=[], metavar="PROJECT", help="Projects of the workspace this project uses, they are found in the sysroot " \
+                           "and built before it by '%(prog)s workspace'.")
+    argParser.add_argument("--update", action="store_true", help="Regenerate an existing project, only the files whose content changed are rewritten. " \
+                                                                   "Source files and files edited since the last generation are left alone.")
+    argParser.add_argument("--archive", metavar="FILE", help="Write the project into a tar or zip archive instead of the current directory, '-' streams it to the standard output.")
+    argParser.add_argument("--archiveFormat", choices=ProjectTree.ArchiveFormats, help="Format of the archive. By default it is deduced from the archive file name, falling back to tar.")
+    argParser.add_argument("--templateDir", help="Directory with templates that override the builtin ones, see builtinTemplates for their names.")
+    argParser.add_argument("--templateCacheDir", help="Directory in which the compiled templates are cached between runs.")
+    argParser.add_argument("--gitInit", action="store_true", help="Create the git repository with the initial commit of the project directly, " \
+                                                                    "instead of leaving it to the init project script.")
+    argParser.add_argument("--gitAuthorName", type=gitIdentityPart, default="Szilard Orban", help="Author of the initial commit. Default is Szilard Orban.")
+    argParser.add_argument("--gitAuthorEmail", type=gitIdentityPart, default="devszilardo@gmail.com", help="Email of the author of the initial commit. Default is devszilardo@gmail.com.")
+    argParser.add_argument("--gitBranch", type=gitBranchName, default="master", help="Branch of the initial commit with --gitInit. Default is master.")
+    argParser.add_argument("--resourceStore", type=os.path.abspath, metavar="DIR", help="Content addressed store shared by the projects, the config resources are " \
+                           "hardlinked or reflinked from it instead of being written for every project. Use '%(prog)s gc DIR' to drop the unused resources.")
+    argParser.add_argument("--profile", nargs="?", const="-", metavar="FILE", help="Measure the wall time, written files, bytes and io calls of every generation stage. " \
+                                                                                  "The stages are printed as a table, or dumped as JSON into FILE.")
+    return argParser
+
+
+## Batch mode
+batchSharedResources = None
+
+
+# Settings of the manifest entries that are paths, relative ones are relative to the manifest
+manifestPathSettings = ["templateDir", "templateCacheDir", "archive", "resourceStore", "profile"]
+
+
+def loadBatchManifest(manifestPath):
+    if manifestPath.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            raise RuntimeError("TOML manifests need python 3.11 or newer, use a JSON manifest instead.")
+        with open(manifestPath, "rb") as f:
+            manifest = tomllib.load(f)
+    else:
+        with open(manifestPath, "r") as f:
+            manifest = json.load(f)
+
+    defaults = {}
+    if isinstance(manifest, dict):
+        defaults = manifest.get("defaults", {})
+        manifest = manifest.get("projects", [])
+    if not isinstance(manifest, list):
+        raise RuntimeError("The manifest must contain a list of projects.")
+
+    manifestDir = os.path.dirname(os.path.abspath(manifestPath))
+    entries = []
+    for entry in manifest:
+        if isinstance(entry, str):
+            entry = { "projectName" : entry }
+        mergedEntry = dict(defaults)
+        mergedEntry.update(entry)
+        for key in manifestPathSettings:
+            if isinstance(mergedEntry.get(key), str) and mergedEntry[key] != "-":
+                mergedEntry[key] = join(manifestDir, mergedEntry[key])
+        entries.append(mergedEntry)
+    return entries
+
+
+def manifestEntryToArgv(entry):
+    if "projectName" not in entry:
+        raise RuntimeError("Manifest entry without a projectName: " + str(entry))
+
+    argv = [str(entry["projectName"])]
+    for key, value in entry.items():
+        if key == "projectName" or value is None or value is False:
+            continue
+        argv.append("--" + key)
+        if isinstance(value, list):
+            argv.extend([str(v) for v in value])
+        elif value is not True:
+            argv.append(str(value))
+    return argv
+
+
+def initBatchWorker(sharedResources):
+    global batchSharedResources
+    batchSharedResources = sharedResources
+
+
+# "-" prints the stage table into the stream, anything else is the path of the JSON report
+def writeProfileReport(profiler, target, stream):
+    if target == "-":
+        print("", file=stream)
+        profiler.printReport(stream)
+        print("", file=stream)
+    elif target:
+        with open(target, "w") as f:
+            json.dump(profiler.report(), f, indent=4)
+            f.write("\n")
+
+
+# Returns the name, the elapsed time, the error and the printed profile report of the project
+def generateBatchProject(args):
+    startTime = time.perf_counter()
+    report = StringIO()
+    try:
+        tree = generateProject(args, batchSharedResources)
+        writeProfileReport(tree.profiler, args.profile, report)
+    except Exception as e:
+        return (args.projectName, time.perf_counter() - startTime, type(e).__name__ + ": " + str(e), None)
+    return (args.projectName, time.perf_counter() - startTime, None, report.getvalue())
+
+
+def runBatch(argv):
+    batchParser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]) + " batch", \
+                                          description="Generates every project listed in a JSON or TOML manifest.")
+    batchParser.add_argument("manifest", help="JSON or TOML file with a list of projects(projectName, cppVersion, defaultTargetType, minCMakeVersion). " \
+                                              "Entries can be plain project names, shared settings can be placed in a 'defaults' table. " \
+                                              "Relative paths of the entries are relative to the manifest.")
+    batchParser.add_argument("--jobs", type=positiveInt, default=os.cpu_count(), help="Number of concurrent workers. Default is the cpu count.")
+    batchParser.add_argument("--executor", choices=["process", "thread"], default="process", help="Run the workers in a process or a thread pool. Default is process.")
+    batchParser.add_argument("--outputDir", default=".", help="Directory in which the projects are generated. Default is the current directory.")
+    batchParser.add_argument("--update", action="store_true", help="Regenerate existing projects, only rewriting the files whose content changed.")
+    batchParser.add_argument("--gitInit", action="store_true", help="Create the git repository with the initial commit of every project.")
+    batchParser.add_argument("--resourceStore", type=os.path.abspath, metavar="DIR", help="Content addressed store from which the config resources of every project are linked.")
+    batchArgs = batchParser.parse_args(argv)
+
+    try:
+        entries = loadBatchManifest(batchArgs.manifest)
+    except (OSError, ValueError, RuntimeError) as e:
+        print("Error: Unable to load the manifest \"" + batchArgs.manifest + "\": " + str(e))
+        sys.exit(-1)
+
+    argParser = createArgParser()
+    projectArgs = []
+    projectNames = set()
+    for index, entry in enumerate(entries):
+        try:
+            argv = manifestEntryToArgv(entry)
+            args = argParser.parse_args(argv)
+        except (SystemExit, RuntimeError) as e:
+            print("Error: Invalid manifest entry #" + str(index) + ": " + str(entry) + (", " + str(e) if isinstance(e, RuntimeError) else ""))
+            sys.exit(-1)
+        args.update = args.update or batchArgs.update
+        if args.update:
+            applySavedSettings(args, argv, join(batchArgs.outputDir, args.projectName))
+        if not all(isValidProjectName(projectName) for projectName in [args.projectName] + args.dependsOn):
+            print("Error: Invalid project name in manifest entry #" + str(index) + ", please don't use any of the following characters: " + "".join(invalidNameTokens))
+            sys.exit(-1)
+        if args.withTracing and args.cppVersion == "03":
+            print("Error: withTracing needs cppVersion 11 or newer in manifest entry #" + str(index) + ": " + args.projectName)
             sys.exit(-1)
+        if args.projectName in projectNames:
+            print("Error: Duplicate project name in manifest entry #" + str(index) + ": " + args.projectName)
+            sys.exit(-1)
+        projectNames.add(args.projectName)
+        args.gitInit = args.gitInit or batchArgs.gitInit
+        args.resourceStore = args.resourceStore or batchArgs.resourceStore
+        projectArgs.append(args)
+
+    os.makedirs(batchArgs.outputDir, 0o755, True)
+    os.chdir(batchArgs.outputDir)
+
+    sharedResources = renderSharedResources()
+    if batchArgs.executor == "process":
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=batchArgs.jobs, initializer=initBatchWorker, initargs=(sharedResources,))
+    else:
+        initBatchWorker(sharedResources)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=batchArgs.jobs)
+
+    print("Generating " + str(len(projectArgs)) + " projects with " + str(batchArgs.jobs) + " " + batchArgs.executor + " workers!\n")
+    failures = []
+    startTime = time.perf_counter()
+    with executor:
+        futures = { executor.submit(generateBatchProject, args) : args.projectName for args in projectArgs }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                projectName, elapsed, error, report = future.result()
+            except concurrent.futures.process.BrokenProcessPool as e:
+                projectName, elapsed, error, report = futures[future], 0.0, "The worker process died: " + str(e), None
+            if error is None:
+                print("    [ok]     {} ({:.1f} ms)".format(projectName, elapsed * 1000))
+                if report:
+                    print(report, end="")
+            else:
+                print("    [failed] {} ({:.1f} ms): {}".format(projectName, elapsed * 1000, error))
+                failures.append(projectName)
+    elapsed = time.perf_counter() - startTime
+
+    print("\nBatch generation finished, {} projects in {:.2f} s ({:.1f} projects/s), {} failed.".format( \
+        len(projectArgs), elapsed, len(projectArgs) / elapsed if elapsed > 0 else 0.0, len(failures)))
+    if failures:
+        print("Failed projects: " + ", ".join(sorted(failures)))
+        sys.exit(1)
+
+
+## Workspace mode
+def findWorkspaceProjects(root, maxDepth):
+    projects = {}
+    rootDepth = os.path.abspath(root).count(os.sep)
+    for directory, dirNames, fileNames in os.walk(root):
+        if ProjectTree.ManifestFileName in fileNames:
+            dirNames[:] = []
+            settings = ProjectTree(directory).loadManifest().get("settings", {})
+            projectName = settings.get("projectName")
+            if not projectName:
+                continue
+            if projectName in projects:
+                raise RuntimeError("The project " + projectName + " is generated both in " + projects[projectName]["path"] + " and in " + directory)
+            projects[projectName] = { "path" : directory, "dependsOn" : settings.get("dependsOn", []) }
+        elif os.path.abspath(directory).count(os.sep) - rootDepth >= maxDepth:
+            dirNames[:] = []
+        else:
+            dirNames[:] = sorted(name for name in dirNames if not name.startswith("."))
+    return projects
+
+
+# Returns the projects in dependency order, each with its level: the length of the longest dependency chain below it
+def sortWorkspaceProjects(projects):
+    levels = {}
+    order = []
+
+    def visit(projectName, chain):
+        if projectName in levels:
+            return
+        if projectName in chain:
+            raise RuntimeError("Dependency cycle: " + " -> ".join(chain[chain.index(projectName):] + [projectName]))
+        level = 0
+        for dependency in sorted(projects[projectName]["dependsOn"]):
+            if dependency not in projects:
+                raise RuntimeError(projectName + " depends on " + dependency + ", which isn't a project of the workspace.")
+            visit(dependency, chain + [projectName])
+            level = max(level, levels[dependency] + 1)
+        levels[projectName] = level
+        order.append(projectName)
+
+    for projectName in sorted(projects):
+        visit(projectName, [])
+    return [(projectName, levels[projectName]) for projectName in order]
+
+
+def runWorkspace(argv):
+    workspaceParser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]) + " workspace", \
+                                              description="Generates a superbuild of the projects generated under a root directory, the projects are " \
+                                                          "built concurrently in the order of their --dependsOn dependencies.")
+    workspaceParser.add_argument("root", nargs="?", default=".", help="Directory with the generated projects. Default is the current directory.")
+    workspaceParser.add_argument("--outputDir", help="Directory of the superbuild. Default is 'workspace' in the root directory.")
+    workspaceParser.add_argument("--maxDepth", type=positiveInt, default=2, help="How deep the projects are searched under the root. Default is 2.")
+    workspaceParser.add_argument("--templateDir", help="Directory with templates that override the builtin ones.")
+    workspaceParser.add_argument("--templateCacheDir", help="Directory in which the compiled templates are cached between runs.")
+    workspaceArgs = workspaceParser.parse_args(argv)
+    outputDir = workspaceArgs.outputDir or join(workspaceArgs.root, "workspace")
+
+    try:
+        projects = findWorkspaceProjects(workspaceArgs.root, workspaceArgs.maxDepth)
+        order = sortWorkspaceProjects(projects)
+    except (OSError, RuntimeError) as e:
+        print("Error: " + str(e))
+        sys.exit(-1)
+    if not projects:
+        print("Error: No generated projects found under \"" + workspaceArgs.root + "\".")
+        sys.exit(-1)
+
+    context = { "workspaceRoot" : os.path.relpath(workspaceArgs.root, outputDir), \
+                "projects" : [{ "name" : projectName, \
+                                "sourceDir" : join("${CMAKE_CURRENT_LIST_DIR}", os.path.relpath(projects[projectName]["path"], outputDir)), \
+                                "dependencies" : " ".join(sorted(projects[projectName]["dependsOn"])) } for projectName, level in order] }
+    try:
+        templates = templateLoader(workspaceArgs)
+        os.makedirs(outputDir, defaultDirectoryMode, True)
+        writeFileAtomically(join(outputDir, "CMakeLists.txt"), templates.render("workspace/CMakeLists.txt", context).encode("utf-8"), None)
+        writeFileAtomically(join(outputDir, "workspace.sh"), templates.render("workspace/workspace.sh", context).encode("utf-8"), 0o770)
+    except TemplateError as e:
+        print("Error: " + str(e))
+        sys.exit(-1)
+
+    levelCount = max(level for projectName, level in order) + 1
+    for level in range(levelCount):
+        print("Level {}: {}".format(level, " ".join(projectName for projectName, projectLevel in order if projectLevel == level)))
+    print("Generated the workspace of {} projects in {} levels, build it with {}.".format(len(order), levelCount, join(outputDir, "workspace.sh")))
+
+
+## Source list sync
+def runSync(argv):
+    syncParser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]) + " sync", \
+                                         description="Updates " + sourceListFileName + " of a generated project with the files of code/src and the include directories. " \
+                                                     "It is only rewritten when a file was added, removed or renamed, so CMake reconfigures only then.")
+    syncParser.add_argument("project", nargs="?", default=".", help="Directory of the generated project. Default is the current directory.")
+    syncParser.add_argument("--templateDir", help="Directory with templates that override the builtin ones.")
+    syncParser.add_argument("--templateCacheDir", help="Directory in which the compiled templates are cached between runs.")
+    syncArgs = syncParser.parse_args(argv)
+
+    startTime = time.perf_counter()
+    tree = ProjectTree(syncArgs.project)
+    manifest = tree.loadManifest()
+    projectName = manifest.get("settings", {}).get("projectName")
+    if not projectName:
+        print("Error: \"" + syncArgs.project + "\" is not a generated project, " + ProjectTree.ManifestFileName + " is missing.")
+        sys.exit(-1)
+
+    generatedSourceList = sourceListFileName in manifest.get("files", {})
+    index = SourceIndex(syncArgs.project)
+    index.load()
+    relPaths = index.scan()
+    oldRelPaths = index.files(index.oldDirectories)
+    sourceListPath = join(syncArgs.project, sourceListFileName)
+    try:
+        content = renderSourceList(templateLoader(syncArgs), projectName, relPaths)
+    except TemplateError as e:
+        print("Error: " + str(e))
+        sys.exit(-1)
+    contentHash = hashlib.sha256(content).hexdigest()
+
+    try:
+        mtime = os.stat(sourceListPath).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    if mtime is not None and mtime == index.sourceList.get("mtime"):
+        diskHash = index.sourceList.get("sha256")
+    elif mtime is not None:
+        with open(sourceListPath, "rb") as f:
+            diskHash = hashlib.sha256(f.read()).hexdigest()
+    else:
+        diskHash = None
+
+    changed = diskHash != contentHash
+    if changed:
+        writeFileAtomically(sourceListPath, content, None)
+        mtime = os.stat(sourceListPath).st_mtime_ns
+        # The generator owns the source list, --update must not take it for a locally modified file
+        files = manifest.setdefault("files", {})
+        files[sourceListFileName] = tree.fileEntry(content, None, False)
+        writeFileAtomically(tree.manifestPath(), tree.renderManifest(manifest), None)
+    sourceList = { "mtime" : mtime, "sha256" : contentHash }
+    if index.scanned or sourceList != index.sourceList or index.directories.keys() != index.oldDirectories.keys():
+        index.sourceList = sourceList
+        writeFileAtomically(index.path(), index.render(), None)
+
+    if not generatedSourceList:
+        print("Note: The project was generated before " + sourceListFileName + " was introduced, regenerate it with --update to use it.")
+    print("{} {}: {} files (+{} -{}), listed {} of {} directories in {:.1f} ms.".format( \
+        "Updated" if changed else "Unchanged", sourceListPath, len(relPaths), len(relPaths - oldRelPaths), len(oldRelPaths - relPaths), \
+        index.scanned, len(index.directories), (time.perf_counter() - startTime) * 1000))
+
+
+## Resource store garbage collection
+def runGc(argv):
+    gcParser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]) + " gc", \
+                                       description="Drops the resources of a resource store that no generated project uses anymore.")
+    gcParser.add_argument("resourceStore", help="The resource store directory.")
+    gcParser.add_argument("--dryRun", action="store_true", help="Only list what would be removed.")
+    gcArgs = gcParser.parse_args(argv)
+
+    if not os.path.isdir(gcArgs.resourceStore):
+        print("Error: The resource store \"" + gcArgs.resourceStore + "\" doesn't exist.")
+        sys.exit(-1)
+
+    staleReferences, garbage, freedBytes = ResourceStore(gcArgs.resourceStore).collectGarbage(gcArgs.dryRun)
+    for path in staleReferences + garbage:
+        print(("Would remove: " if gcArgs.dryRun else "Removed: ") + path)
+    print("{} {} unused resources ({} bytes) and {} stale project references.".format( \
+        "Found" if gcArgs.dryRun else "Removed", len(garbage), freedBytes, len(staleReferences)))
+
+
+subCommands = { "batch" : runBatch, "workspace" : runWorkspace, "sync" : runSync, "gc" : runGc }
 
-    paths = generatePaths(args)
-    args.projectName = args.projectName.replace(" ", "_")
-    generateCMakeFiles(paths, args)
-    generateMakeScript(paths, args)
-    generateDefaultSourceFiles(paths, args)
-    generateDefaultClangFormatConfig(paths)
-    generateGitIgnore(paths)
-    generateGitMessage(paths)
-    generateGitPreCommitHook(paths)
-    generateDefaultEnvironmentScript(paths)
-    generateDefaultInitProjectScript(paths, args)
-    print("Project generation finished..")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in subCommands:
+        subCommands[sys.argv[1]](sys.argv[2:])
+        sys.exit(0)
+
+    argParser = createArgParser()
+    args = argParser.parse_args()
+    if args.update:
+        applySavedSettings(args, sys.argv[1:], args.projectName)
+    if args.archive and args.update:
+        argParser.error("--update can not be combined with --archive.")
+    if args.withTracing and args.cppVersion == "03":
+        argParser.error("--withTracing needs --cppVersion 11 or newer.")
+
+    # Keep the standard output clean when the archive is streamed through it
+    messageStream = sys.stderr if args.archive == "-" else sys.stdout
+    print("Generating your project!\n", file=messageStream)
+
+    if not all(isValidProjectName(projectName) for projectName in [args.projectName] + args.dependsOn):
+        print("Error: Invalid project name specified, please don't use any of the following characters: " + "".join(invalidNameTokens), file=messageStream)
+        print("       Try to use alphanum characters instead!", file=messageStream)
+        sys.exit(-1)
+
+    try:
+        tree = generateProject(args)
+    except TemplateError as e:
+        print("Error: " + str(e), file=messageStream)
+        sys.exit(-1)
+    if args.update:
+        for path in tree.kept:
+            print("Kept locally modified file: " + path)
+        for path in tree.removed:
+            print("Removed file that is no longer generated: " + path)
+        for path in tree.stale:
+            print("Left file that is no longer generated: " + path)
+        print("Updated " + str(len(tree.written)) + " files, " + str(tree.unchanged) + " unchanged.")
+    writeProfileReport(tree.profiler, args.profile, messageStream)
+    print("Project generation finished..", file=messageStream)